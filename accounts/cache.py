@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+User = get_user_model()
+
+# 存在しないユーザー名は 0 をキャッシュして、404 でも毎回クエリを投げないようにする
+MISSING = 0
+
+
+def user_id_key(username):
+    return f"accounts:user_id:{username}"
+
+
+def get_user_id(username):
+    key = user_id_key(username)
+    user_id = cache.get(key)
+    if user_id is None:
+        user_id = User.objects.filter(username=username).values_list("id", flat=True).first() or MISSING
+        timeout = settings.USER_ID_CACHE_TIMEOUT if user_id else settings.USER_ID_NEGATIVE_CACHE_TIMEOUT
+        cache.set(key, user_id, timeout)
+    return user_id or None
+
+
+def invalidate_usernames(*usernames):
+    cache.delete_many([user_id_key(username) for username in usernames if username])
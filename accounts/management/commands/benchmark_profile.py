@@ -0,0 +1,52 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from accounts.cache import get_user_id
+from mysite import benchmarks
+from mysite.testing import isolated_cache
+from tweets.models import Tweet
+
+User = benchmarks.User
+
+
+class Command(BaseCommand):
+    help = "プロフィールページのユーザー検索について、キャッシュ導入前後のクエリ数とレイテンシを計測します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--tweets", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        # 404 のたびに出る "Not Found" ログを抑える
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        # 共有の default キャッシュは消さず、ロールバックしたユーザーの分も残さないよう使い捨てのキャッシュで計測する
+        with benchmarks.rollback(), isolated_cache():
+            users = benchmarks.seed(users=options["users"], tweets=options["tweets"])
+            viewer, target = users[0], users[1]
+
+            def legacy_lookup():
+                user = get_object_or_404(User, username=target.username)
+                list(Tweet.objects.select_related("user").filter(user=user))
+
+            def cached_lookup():
+                list(Tweet.objects.select_related("user").filter(user_id=get_user_id(target.username)))
+
+            client = benchmarks.client(viewer)
+            url = reverse("accounts:user_profile", args=[target.username])
+            missing_url = reverse("accounts:user_profile", args=["missing-user"])
+
+            rows = [
+                ("lookup: before (get_object_or_404)", legacy_lookup),
+                ("lookup: after (user id cache)", cached_lookup),
+                ("view: other user's profile", lambda: client.get(url)),
+                ("view: own profile", lambda: client.get(reverse("accounts:user_profile", args=[viewer.username]))),
+                ("view: missing user (404)", lambda: client.get(missing_url)),
+            ]
+            self.stdout.write(f"{'case':<38}{'queries':>10}{'latency(ms)':>14}")
+            for label, func in rows:
+                seconds, queries = benchmarks.measure(func, repeat=options["repeat"])
+                self.stdout.write(f"{label:<38}{queries:>10.1f}{seconds * 1000:>14.3f}")
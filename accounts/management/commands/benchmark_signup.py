@@ -0,0 +1,63 @@
+import itertools
+import time
+
+from django.contrib.auth import authenticate, login
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.views.generic import CreateView
+
+from accounts.views import SignupView
+from mysite import benchmarks
+
+
+class LegacySignupView(SignupView):
+    """比較用: 保存後に authenticate() でパスワードをもう一度検証していた以前の実装"""
+
+    def form_valid(self, form):
+        response = CreateView.form_valid(self, form)
+        user = authenticate(
+            self.request, username=form.cleaned_data["username"], password=form.cleaned_data["password1"]
+        )
+        if user is not None:
+            login(self.request, user)
+        return response
+
+
+class Command(BaseCommand):
+    help = "サインアップのスループットとクエリ数を、以前の実装 (authenticate() あり) と比較します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--signups", type=int, default=20)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory(HTTP_HOST="localhost")
+        counter = itertools.count()
+        self.stdout.write(f"{'view':<10}{'signups/s':>12}{'ms/signup':>12}{'queries':>10}")
+        for name, view in (("before", LegacySignupView.as_view()), ("after", SignupView.as_view())):
+            with benchmarks.rollback(), CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(options["signups"]):
+                    i = next(counter)
+                    request = factory.post(
+                        reverse("accounts:signup"),
+                        {
+                            "username": f"signup{i}",
+                            "email": f"signup{i}@example.com",
+                            "password1": "benchmark-password",
+                            "password2": "benchmark-password",
+                        },
+                    )
+                    request._dont_enforce_csrf_checks = True
+                    request.user = AnonymousUser()
+                    SessionMiddleware(lambda request: None).process_request(request)
+                    response = view(request)
+                    assert response.status_code == 302, response.status_code
+                seconds = time.perf_counter() - started
+            per_signup = seconds / options["signups"]
+            per_queries = len(queries) / options["signups"]
+            self.stdout.write(f"{name:<10}{1 / per_signup:>12.1f}{per_signup * 1000:>12.1f}{per_queries:>10.1f}")
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-19 11:12
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                condition=models.Q(("email", ""), _negated=True),
+                name="accounts_user_email_unique",
+                violation_error_message="このメールアドレスは既に登録されています。",
+            ),
+        ),
+    ]
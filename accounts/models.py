@@ -1,9 +1,23 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+
+EMAIL_UNIQUE_ERROR = "このメールアドレスは既に登録されています。"
 
 
 class User(AbstractUser):
     email = models.EmailField()
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # メールアドレスなしで作られたユーザー (createsuperuser など) は何人いてもよい
+            models.UniqueConstraint(
+                Lower("email"),
+                condition=~models.Q(email=""),
+                name="accounts_user_email_unique",
+                violation_error_message=EMAIL_UNIQUE_ERROR,
+            ),
+        ]
+
 
 # class FriendShip(models.Model):
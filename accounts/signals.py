@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from mysite.pagecache import invalidate_tags, user_tag
+
+from .cache import invalidate_usernames
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # ユーザー名の変更を検知するため、読み込んだ時点のユーザー名を覚えておく。
+    # only() などで username が遅延読み込みのときは None にして、ここでクエリを発行しない
+    instance._loaded_username = instance.__dict__.get("username")
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_id_cache(sender, instance, created, using, **kwargs):
+    # username を読み込んでいなければ変更もされていない
+    username = instance.__dict__.get("username")
+    if created or instance._loaded_username != username:
+        # コミット前に無効化すると、同じトランザクション内の検索が古い結果 (404 など) をキャッシュし直してしまう
+        usernames = (instance._loaded_username, username)
+        transaction.on_commit(lambda: invalidate_usernames(*usernames), using=using)
+        instance._loaded_username = username
+
+
+@receiver(pre_delete, sender=User)
+def load_deleted_username(sender, instance, **kwargs):
+    # 削除後は username を読み込めないので、遅延読み込みの場合はここで読んでおく
+    if instance._loaded_username is None:
+        instance._loaded_username = instance.username
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_id_cache(sender, instance, using, **kwargs):
+    username = instance._loaded_username
+    transaction.on_commit(lambda: invalidate_usernames(username), using=using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_pages(sender, instance, using, update_fields=None, **kwargs):
+    # ログインのたびに last_login だけが更新されるが、ページの内容には影響しない
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    tag = user_tag(instance.pk)
+    transaction.on_commit(lambda: invalidate_tags(tag), using=using)
@@ -1,8 +1,14 @@
+from unittest import mock
+
 from django.conf import settings
 from django.contrib.auth import SESSION_KEY, get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
+from accounts.cache import MISSING, user_id_key
+from accounts.models import EMAIL_UNIQUE_ERROR
+from mysite.testing import run_in_another_process
 from tweets.models import Tweet
 
 User = get_user_model()
@@ -107,6 +113,59 @@ class TestSignupView(TestCase):
 
         self.assertEqual(User.objects.count(), 1)
 
+    def test_success_post_without_rehashing_password(self):
+        valid_data = {
+            "username": "testuser",
+            "email": "test@test.com",
+            "password1": "testpassword",
+            "password2": "testpassword",
+        }
+        with mock.patch("django.contrib.auth.hashers.PBKDF2PasswordHasher.verify") as verify:
+            response = self.client.post(self.url, valid_data)
+        self.assertEqual(response.status_code, 302)
+        verify.assert_not_called()
+        self.assertEqual(int(self.client.session[SESSION_KEY]), User.objects.get(username="testuser").pk)
+
+    def test_failure_post_with_duplicated_email(self):
+        User.objects.create_user(username="testuser", email="Test@Example.com", password="testpassword")
+        duplicated_data = {
+            "username": "testuser2",
+            "email": "test@example.com",
+            "password1": "testpassword",
+            "password2": "testpassword",
+        }
+
+        response = self.client.post(self.url, duplicated_data)
+        self.assertEqual(response.status_code, 200)
+
+        form = response.context["form"]
+        self.assertEqual(form.errors["__all__"], [EMAIL_UNIQUE_ERROR])
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_failure_post_with_concurrently_duplicated_user(self):
+        duplicated_data = {
+            "username": "testuser",
+            "email": "test@example.com",
+            "password1": "testpassword",
+            "password2": "testpassword",
+        }
+        User.objects.create_user(username="testuser", email="other@example.com", password="testpassword")
+
+        # 検証をすり抜けて、保存時に DB の制約で弾かれる場合
+        with mock.patch.object(User, "validate_unique"), mock.patch.object(User, "validate_constraints"):
+            response = self.client.post(self.url, duplicated_data)
+        self.assertEqual(response.status_code, 200)
+
+        form = response.context["form"]
+        self.assertEqual(form.errors["username"], ["同じユーザー名が既に登録済みです。"])
+        self.assertEqual(User.objects.count(), 1)
+        self.assertNotIn(SESSION_KEY, self.client.session)
+
+    def test_success_create_users_without_email(self):
+        User.objects.create_user(username="testuser1", password="testpassword")
+        User.objects.create_user(username="testuser2", password="testpassword")
+        self.assertEqual(User.objects.filter(email="").count(), 2)
+
     def test_failure_post_with_invalid_email(self):
         email_failure_data = {
             "username": "testuser",
@@ -266,6 +325,7 @@ class TestUserProfileView(TestCase):
         self.user2 = User.objects.create_user(username="testuser2", email="test2@example.com", password="testpassword")
         self.url = reverse("accounts:user_profile", args=[self.user1.username])
         self.client.force_login(self.user1)
+        cache.clear()
 
     def test_success_get(self):
         Tweet.objects.create(user=self.user1, content="testcontent")
@@ -274,6 +334,84 @@ class TestUserProfileView(TestCase):
 
         self.assertQuerysetEqual(response.context["tweets"], Tweet.objects.filter(user=self.user1))
 
+    def test_success_get_with_cached_user_id(self):
+        Tweet.objects.create(user=self.user2, content="testcontent")
+        url = reverse("accounts:user_profile", args=[self.user2.username])
+        # セッション、ログインユーザー、ユーザー ID、ツイート
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertQuerysetEqual(response.context["tweets"], Tweet.objects.filter(user=self.user2))
+
+    def test_success_get_own_profile(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_failure_get_with_not_exists_user(self):
+        url = reverse("accounts:user_profile", args=["nobody"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username="nobody", email="nobody@example.com", password="testpassword")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_success_get_after_negative_cache_during_transaction(self):
+        url = reverse("accounts:user_profile", args=["nobody"])
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username="nobody", email="nobody@example.com", password="testpassword")
+            # コミット前に別のワーカーが 404 をキャッシュし直しても、コミット後に無効化される
+            cache.set(user_id_key("nobody"), MISSING)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_success_get_with_anonymous_user_from_cache(self):
+        self.client.logout()
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tweet.objects.create(user=self.user1, title="test", content="newtweet")
+        response = self.client.get(self.url)
+        self.assertContains(response, "newtweet")
+
+    def test_success_get_after_invalidation_in_another_process(self):
+        url = reverse("accounts:user_profile", args=[self.user2.username])
+        self.client.get(url)
+        # 別のワーカーでユーザー名を変えたときの無効化を、別プロセスのキャッシュクライアントで再現する
+        run_in_another_process("from accounts import cache; cache.invalidate_usernames('testuser2')")
+        # セッション、ログインユーザー、ユーザー ID、ツイート
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+    def test_deferred_username_without_queries(self):
+        with self.assertNumQueries(1):
+            users = list(User.objects.only("id"))
+        self.assertEqual(len(users), 2)
+
+    def test_success_get_after_delete_with_deferred_username(self):
+        url = reverse("accounts:user_profile", args=[self.user2.username])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user2.pk).only("id").get().delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_success_get_after_username_change(self):
+        old_url = reverse("accounts:user_profile", args=[self.user2.username])
+        self.assertEqual(self.client.get(old_url).status_code, 200)
+
+        self.user2.username = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertEqual(self.client.get(reverse("accounts:user_profile", args=["renamed"])).status_code, 200)
+
 
 # class TestUserProfileEditView(TestCase):
 #     def test_success_get(self):
@@ -1,13 +1,16 @@
 from django.conf import settings
-from django.contrib.auth import authenticate, get_user_model, login
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.contrib.auth import get_user_model, login
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, ListView
 
-from tweets.models import Tweet
+from mysite.pagecache import CachedPageMixin, user_tag
+from tweets.models import ArchivedTweet, Tweet
 
+from .cache import get_user_id
 from .forms import SignupForm
+from .models import EMAIL_UNIQUE_ERROR
 
 User = get_user_model()
 
@@ -18,23 +21,44 @@ class SignupView(CreateView):
     success_url = reverse_lazy(settings.LOGIN_REDIRECT_URL)
 
     def form_valid(self, form):
-        response = super().form_valid(form)
-        username = form.cleaned_data.get("username")
-        email = form.cleaned_data.get("email")
-        password = form.cleaned_data.get("password1")
-        user = authenticate(self.request, username=username, email=email, password=password)
-        if user is not None:
-            login(self.request, user)
-        return response
+        try:
+            with transaction.atomic():
+                self.object = form.save()
+        except IntegrityError:
+            # フォームの検証と保存の間に、同じユーザー名かメールアドレスで別の登録が完了した場合
+            if User.objects.filter(username=form.cleaned_data["username"]).exists():
+                form.add_error("username", User._meta.get_field("username").error_messages["unique"])
+            else:
+                form.add_error(None, EMAIL_UNIQUE_ERROR)
+            return self.form_invalid(form)
+        # 作成したユーザーでそのままログインする (authenticate() でパスワードをもう一度ハッシュしない)
+        login(self.request, self.object)
+        return HttpResponseRedirect(self.get_success_url())
 
 
-class UserProfileView(LoginRequiredMixin, ListView):
+class UserProfileView(CachedPageMixin, ListView):
     template_name = "accounts/user_profile.html"
     model = Tweet
     slug_field = "username"
     slug_url_kwargs = "username"
     context_object_name = "tweets"
 
+    def get_user_id(self):
+        username = self.kwargs["username"]
+        # 自分のプロフィールならリクエスト中に読み込み済みの request.user を使い回す
+        if self.request.user.username == username:
+            return self.request.user.pk
+        return get_user_id(username)
+
+    def get_cache_tags(self):
+        user_id = self.get_user_id()
+        return None if user_id is None else (user_tag(user_id),)
+
     def get_queryset(self):
-        user = get_object_or_404(User, username=self.kwargs["username"])
-        return Tweet.objects.select_related("user").filter(user=user)
+        user_id = self.get_user_id()
+        if user_id is None:
+            raise Http404
+        # UNION の各 SELECT には ORDER BY を付けられないので、並び替えは最後にまとめて行う
+        hot = Tweet.objects.filter(user_id=user_id).order_by().rows()
+        archived = ArchivedTweet.objects.filter(user_id=user_id).order_by().rows()
+        return hot.union(archived, all=True).order_by("-created_at")
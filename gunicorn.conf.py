@@ -0,0 +1,57 @@
+"""
+本番用の gunicorn の設定。リポジトリのルートで `gunicorn` を実行すると読み込まれる。
+各値は環境変数 (GUNICORN_WORKERS など) かコマンドラインの引数で上書きできる。
+
+preload_app を有効にしているので、アプリケーションは親プロセスで一度だけ読み込まれる。
+    kill -HUP <master pid>   設定を読み直し、ワーカーを順に入れ替える (アプリケーションのコードは読み直さない)
+    kill -USR2 <master pid>  新しいコードで新しい master を起動する。起動を確認したら古い master に
+                             WINCH でワーカーを止めさせてから QUIT を送る
+"""
+
+import os
+
+from mysite.workers import default_workers
+
+wsgi_app = "mysite.wsgi:application"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# ワーカー (プロセス) 数は CPU 数から決める。DB を待つ間に他のリクエストを処理できるよう、各ワーカーでスレッドも使う
+workers = int(os.environ.get("GUNICORN_WORKERS", default_workers()))
+threads = int(os.environ.get("GUNICORN_THREADS", 2))
+worker_class = "gthread"
+
+# fork 前に親プロセスでアプリケーションを読み込み、copy-on-write でワーカーに共有する
+preload_app = True
+
+# メモリリークなどの影響を抑えるため、一定数のリクエストを処理したワーカーを入れ替える。
+# jitter で入れ替えのタイミングをずらし、全ワーカーが同時に再起動しないようにする
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG")
+errorlog = "-"
+
+
+def when_ready(server):
+    from mysite.warmup import warm_up
+
+    loaded = warm_up()
+    server.log.info("Warmed up %d templates", len(loaded))
+
+
+def pre_fork(server, worker):
+    # 親プロセスの DB 接続をワーカーに引き継がないよう、fork の前に閉じる。各ワーカーは最初のクエリで接続する
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # max_requests での入れ替えや停止で、まだ共有していないトレンドの記録が失われないようにする
+    from tweets import trending
+
+    trending.flush()
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
 
 application = get_asgi_application()
+
+from mysite.static import ASGIStaticFilesMiddleware  # noqa: E402
+
+# collectstatic 済みの STATIC_ROOT を Django を通さずに配信する
+application = ASGIStaticFilesMiddleware(application)
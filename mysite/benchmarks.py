@@ -0,0 +1,72 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rollback():
+    """ベンチマーク用に投入したデータをブロックの最後にまとめてロールバックする"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def seed(users=10, tweets=1000, batch_size=5000, spread=None):
+    """spread (timedelta) を渡すと、ツイートの created_at を現在からその期間の過去まで均等にばらす"""
+    from tweets.models import Tweet
+
+    password = make_password("benchmark-password")
+    created = User.objects.bulk_create(
+        [User(username=f"bench{i}", email=f"bench{i}@example.com", password=password) for i in range(users)]
+    )
+    for offset in range(0, tweets, batch_size):
+        Tweet.objects.bulk_create(
+            [
+                Tweet(user=created[i % users], title=f"title {i}", content=f"content {i} #bench{i % 50}")
+                for i in range(offset, min(offset + batch_size, tweets))
+            ]
+        )
+    if spread is not None:
+        now = timezone.now()
+        step = spread / max(tweets, 1)
+        ids = Tweet.objects.order_by("id").values_list("id", flat=True)
+        Tweet.objects.bulk_update(
+            [Tweet(id=pk, created_at=now - step * i) for i, pk in enumerate(ids)], ["created_at"], batch_size=1000
+        )
+    return created
+
+
+def client(user=None):
+    # テスト環境をセットアップしなくても ALLOWED_HOSTS を通るホスト名を使う
+    client = Client(HTTP_HOST="localhost")
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def measure(func, repeat=20):
+    """func を repeat 回実行し、(1回あたりの中央値秒, 1回あたりのクエリ数) を返す"""
+    func()
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(queries) / repeat
@@ -0,0 +1,120 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from .static import choose_encoding
+
+try:
+    import brotli
+except ImportError:  # brotli が無い環境では gzip だけを使う
+    brotli = None
+
+# <pre> などの中身と、属性値の途中で改行しているタグは空白に意味があるので、そのまま残す
+PRESERVE_RE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>|<[^<>\n]*\n[^<>]*>)", re.S | re.I)
+
+WHITESPACE_RE = re.compile(r"\n\s*")
+
+
+def minify_html(html):
+    # split() の結果は [テキスト, 残すブロック, タグ名, テキスト, ...] の順に並ぶ
+    parts = PRESERVE_RE.split(html)
+    for i in range(0, len(parts), 3):
+        parts[i] = WHITESPACE_RE.sub("\n", parts[i])
+        if i + 2 < len(parts):
+            parts[i + 2] = ""
+    return "".join(parts)
+
+
+def content_type_of(response):
+    return response.get("Content-Type", "").split(";")[0].strip().lower()
+
+
+class HtmlMinifyMiddleware:
+    """テンプレートのインデントや空行を 1 つの改行にまとめる"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not settings.HTML_MINIFY
+            or response.streaming
+            or response.has_header("Content-Encoding")
+            or content_type_of(response) != "text/html"
+        ):
+            return response
+        response.content = minify_html(response.content.decode(response.charset)).encode(response.charset)
+        if response.has_header("Content-Length"):
+            response["Content-Length"] = str(len(response.content))
+        return response
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        # チャンクごとに flush して、届いた分をすぐクライアントへ送れるようにする
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_stream(chunks):
+    compressor = brotli.Compressor(quality=4)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    COMPRESSION_CONTENT_TYPES のレスポンスを brotli か gzip で圧縮する。
+    COMPRESSION_MIN_SIZE 未満のレスポンスはそのまま返す。StreamingHttpResponse はチャンクごとに圧縮する。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.has_header("Content-Encoding")
+            or content_type_of(response) not in settings.COMPRESSION_CONTENT_TYPES
+            or (not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self.select_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            stream = brotli_stream if encoding == "br" else gzip_stream
+            response.streaming_content = stream(response.streaming_content)
+            del response["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=4)
+            else:
+                compressed = compress_string(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(response.content))
+
+        # 圧縮するとバイト列が変わるので、強い ETag は弱い ETag にする
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def select_encoding(self, accept_encoding):
+        return choose_encoding(accept_encoding, ("br", "gzip") if brotli is not None else ("gzip",))
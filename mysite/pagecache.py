@@ -0,0 +1,87 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+
+def tag_key(tag):
+    return f"pagecache:tag:{tag}"
+
+
+def user_tag(user_id):
+    return f"user:{user_id}"
+
+
+def tag_versions(tags):
+    """
+    タグごとのバージョンを返す。ページのキャッシュキーにバージョンを含めておくと、
+    タグのバージョンを変えるだけでそのタグを持つページがまとめて無効になる。
+    """
+    keys = [tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(*tags):
+    cache.set_many({tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+
+
+def page_key(request, tags):
+    source = "|".join([request.build_absolute_uri(), *tag_versions(tags)])
+    return "pagecache:page:" + hashlib.md5(source.encode()).hexdigest()
+
+
+def is_cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # csrf_token を埋め込んだページは閲覧者ごとに内容が変わるのでキャッシュしない
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+class CachedPageMixin:
+    """
+    未ログインユーザーへの GET レスポンスを丸ごとキャッシュする。
+    キャッシュは get_cache_tags() が返すタグを invalidate_tags() したときに無効になる。
+    保存するのはミドルウェアを通る前のレスポンスなので、HTML の minify と圧縮はヒットしたときも毎回行う
+    (コストは benchmark_pagecache の hit (br) で確認できる)。
+    """
+
+    cache_tags = ()
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        tags = self.get_cache_tags()
+        if tags is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        key = page_key(request, tags)
+        response = cache.get(key)
+        if response is not None:
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        patch_vary_headers(response, ("Cookie",))
+
+        def store(response):
+            if request.method == "GET" and is_cacheable(request, response):
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+
+        if hasattr(response, "render") and callable(response.render):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
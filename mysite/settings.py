@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 AUTH_USER_MODEL = "accounts.User"
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "mysite.middleware.CompressionMiddleware",
+    "mysite.middleware.HtmlMinifyMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -82,6 +85,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # gunicorn の各ワーカーのスレッドごとに接続を使い回し、リクエストごとに接続し直さない
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -122,6 +128,11 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# ハッシュ付きのファイル名と、collectstatic 時に作る .gz / .br
+STATICFILES_STORAGE = "mysite.storage.CompressedManifestStaticFilesStorage"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -133,4 +144,82 @@ LOGOUT_REDIRECT_URL = "accounts:login"
 
 LOGIN_URL = "accounts:login"
 
+# レスポンスの圧縮と HTML の空白の削除 (mysite.middleware)
+
+HTML_MINIFY = True
+
+COMPRESSION_MIN_SIZE = 512
+
+COMPRESSION_CONTENT_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)
+
+# キャッシュ
+# ページキャッシュのタグやユーザー ID のキャッシュは gunicorn の全ワーカーで共有する必要があるので、
+# プロセスごとの LocMemCache は使わない。REDIS_URL があれば Redis、無ければ同じホストのワーカー間で
+# 共有できるファイルキャッシュを使う。テストやベンチマークは mysite.testing.isolated_cache() で
+# 使い捨てのキャッシュに差し替え、CACHE_DIR (DJANGO_CACHE_DIR) で子プロセスにもその場所を渡す
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+CACHE_DIR = os.environ.get("DJANGO_CACHE_DIR", BASE_DIR / ".cache")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR,
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# ユーザー名 -> ユーザー ID のキャッシュ (秒)
+
+USER_ID_CACHE_TIMEOUT = 60 * 60
+
+USER_ID_NEGATIVE_CACHE_TIMEOUT = 60
+
+# 未ログインユーザー向けページキャッシュの保険の有効期限 (秒)
+# 通常は mysite.pagecache.invalidate_tags() で明示的に無効化する
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# tweets:batch_create で一度に投稿できるツイートの上限
+
+TWEET_BATCH_MAX_SIZE = 100
+
+# この日数より古いツイートは archive_tweets コマンドで ArchivedTweet へ移す
+
+TWEET_ARCHIVE_AFTER_DAYS = 90
+
+# Trending hashtags
+# 直近 TRENDING_BUCKET_SECONDS * TRENDING_WINDOW_BUCKETS 秒の投稿を集計する
+
+TRENDING_BUCKET_SECONDS = 300
+
+TRENDING_WINDOW_BUCKETS = 12
+
+TRENDING_DECAY = 0.9
+
+TRENDING_COUNTER = "sketch"
+
+TRENDING_SNAPSHOT_INTERVAL = 60
+
 AUTH_USER_MODEL = "accounts.User"
+
+# テストは使い捨てのキャッシュで実行する
+
+TEST_RUNNER = "mysite.testing.TestRunner"
@@ -0,0 +1,23 @@
+"""
+API / アプリケーションサーバー用の軽量な設定。
+
+管理画面 (django.contrib.admin) と messages を読み込まないので、ワーカーの起動が速くなる。
+DJANGO_SETTINGS_MODULE=mysite.settings_worker で使う。管理画面は通常の mysite.settings で動かすこと。
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+UNUSED_APPS = ("django.contrib.admin", "django.contrib.messages")
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if not middleware.startswith(UNUSED_APPS)]
+
+TEMPLATES = [{**template, "OPTIONS": {**template["OPTIONS"]}} for template in TEMPLATES]
+
+for template in TEMPLATES:
+    processors = template["OPTIONS"]["context_processors"]
+    template["OPTIONS"]["context_processors"] = [name for name in processors if not name.startswith(UNUSED_APPS)]
+
+ROOT_URLCONF = "mysite.urls_worker"
@@ -0,0 +1,128 @@
+"""
+ワーカーの起動時間 (import 時間と最初のレスポンスまでの時間) を計測する。
+
+    python -m mysite.startup --settings mysite.settings mysite.settings_worker --runs 5
+
+計測ごとに新しい Python プロセスを起動するので、キャッシュ済みの import は結果に影響しない。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# 子プロセスで実行する計測用のスクリプト
+PROBE = r"""
+import asyncio, importlib, json, os, sys, time
+
+started = time.perf_counter()
+os.environ["DJANGO_SETTINGS_MODULE"] = sys.argv[1]
+module = importlib.import_module(sys.argv[2])
+imported = time.perf_counter()
+
+path = sys.argv[3]
+if sys.argv[2].endswith("asgi"):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    asyncio.run(module.application(scope, receive, send))
+    status = str(messages[0]["status"])
+else:
+    statuses = []
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "SERVER_NAME": "localhost", "SERVER_PORT": "80",
+        "HTTP_HOST": "localhost", "wsgi.url_scheme": "http", "wsgi.input": None,
+    }
+    body = module.application(environ, lambda status, headers: statuses.append(status))
+    b"".join(body)
+    status = statuses[0]
+responded = time.perf_counter()
+
+print(json.dumps({"import": imported - started, "first_response": responded - imported, "status": status}))
+"""
+
+
+def probe(settings, entry, path, importtime=False):
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", PROBE, settings, entry, path]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    total = time.perf_counter() - started
+    return {**json.loads(result.stdout.splitlines()[-1]), "process": total}, result.stderr
+
+
+def slowest_imports(stderr, top):
+    """-X importtime の出力から、自身の import にかかった時間 (self) が長いモジュールを返す"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:") :].split("|")
+        rows.append((int(own), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--settings", nargs="+", default=["mysite.settings", "mysite.settings_worker"])
+    parser.add_argument("--entry", nargs="+", default=["mysite.wsgi", "mysite.asgi"])
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--importtime", type=int, default=0, metavar="N", help="import の遅いモジュールを N 件表示する"
+    )
+    parser.add_argument("--markdown", action="store_true", help="GitHub Actions の job summary 用に表で出力する")
+    options = parser.parse_args(argv)
+
+    rows = []
+    for settings in options.settings:
+        for entry in options.entry:
+            results = [probe(settings, entry, options.path)[0] for _ in range(options.runs)]
+            rows.append(
+                (
+                    settings,
+                    entry,
+                    results[0]["status"],
+                    *(
+                        statistics.median(result[key] for result in results) * 1000
+                        for key in ("import", "first_response", "process")
+                    ),
+                )
+            )
+
+    if options.markdown:
+        print("| settings | entry | status | import (ms) | first response (ms) | process (ms) |")
+        print("| --- | --- | --- | ---: | ---: | ---: |")
+        for settings, entry, status, *timings in rows:
+            print(f"| {settings} | {entry} | {status} | " + " | ".join(f"{timing:.1f}" for timing in timings) + " |")
+    else:
+        print(f"{'settings':<26}{'entry':<14}{'status':<10}{'import(ms)':>12}{'first(ms)':>12}{'process(ms)':>13}")
+        for settings, entry, status, *timings in rows:
+            print(f"{settings:<26}{entry:<14}{status:<10}" + "".join(f"{timing:>12.1f}" for timing in timings))
+
+    if options.importtime:
+        for settings in options.settings:
+            _, stderr = probe(settings, options.entry[0], options.path, importtime=True)
+            print(f"\nslowest imports ({settings}, {options.entry[0]}):")
+            for own, name in slowest_imports(stderr, options.importtime):
+                print(f"  {own / 1000:>8.2f} ms  {name}")
+
+
+if __name__ == "__main__":
+    os.chdir(BASE_DIR)
+    main()
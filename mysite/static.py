@@ -0,0 +1,210 @@
+import asyncio
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from pathlib import Path
+
+from django.conf import settings
+
+# ManifestStaticFilesStorage が付ける 12 桁のハッシュ (例: base.1a2b3c4d5e6f.css)
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+DEFAULT_CACHE_CONTROL = "public, max-age=60"
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(accept_encoding):
+    """Accept-Encoding ヘッダーを {コーディング: q 値} にする"""
+    qualities = {}
+    for token in accept_encoding.split(","):
+        coding, *params = token.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding, encodings):
+    """
+    encodings (サーバーが優先する順) のうち、クライアントの q 値が最も高いものを返す。
+    q=0 のもの (例: "br;q=0, gzip" の br) は選ばない。使えるものが無ければ None
+    """
+    qualities = accepted_encodings(accept_encoding)
+    default = qualities.get("*", 0.0)
+    chosen, best = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, default)
+        if quality > best:
+            chosen, best = encoding, quality
+    return chosen
+
+
+class StaticFile:
+    def __init__(self, path, url):
+        self.path = path
+        stat = path.stat()
+        content_type, _ = mimetypes.guess_type(path.name)
+        self.headers = [
+            ("Content-Type", content_type or "application/octet-stream"),
+            ("Last-Modified", formatdate(stat.st_mtime, usegmt=True)),
+            ("Cache-Control", IMMUTABLE_CACHE_CONTROL if HASHED_NAME_RE.search(url) else DEFAULT_CACHE_CONTROL),
+            ("Vary", "Accept-Encoding"),
+        ]
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        # (Content-Encoding, パス, サイズ) を優先度順に持つ
+        self.variants = [
+            (encoding, variant, variant.stat().st_size)
+            for encoding, suffix in ENCODINGS
+            if (variant := path.with_name(path.name + suffix)).is_file()
+        ]
+        self.variants.append((None, path, stat.st_size))
+
+    def select(self, accept_encoding):
+        encoding = choose_encoding(accept_encoding, [variant[0] for variant in self.variants[:-1]])
+        for variant in self.variants:
+            if variant[0] == encoding:
+                return variant
+
+    def response_headers(self, encoding, size):
+        headers = [*self.headers, ("Content-Length", str(size))]
+        if encoding is not None:
+            headers.append(("Content-Encoding", encoding))
+            # 圧縮の有無で中身が変わるので、ETag も分ける
+            headers.append(("ETag", f'{self.etag[:-1]}-{encoding}"'))
+        else:
+            headers.append(("ETag", self.etag))
+        return headers
+
+
+class StaticFileIndex:
+    """
+    STATIC_ROOT 以下のファイルを起動時に一度だけ走査しておき、リクエストごとに
+    ファイルシステムを探さないようにする。索引に無いパスは配信しない。
+    """
+
+    def __init__(self, root=None, prefix=None):
+        self.root = Path(root or settings.STATIC_ROOT)
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = {}
+        if self.root.is_dir():
+            for dirpath, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    if filename.endswith((".gz", ".br")):
+                        continue
+                    path = Path(dirpath, filename)
+                    url = self.prefix + path.relative_to(self.root).as_posix()
+                    self.files[url] = StaticFile(path, url)
+
+    def find(self, path):
+        if path.startswith(self.prefix):
+            return self.files.get(path)
+
+
+def not_modified_headers(headers):
+    return [(name, value) for name, value in headers if name in ("Cache-Control", "ETag", "Vary")]
+
+
+class StaticFilesMiddleware:
+    """
+    collectstatic 済みのファイルを Django を通さずに配信する WSGI ミドルウェア。
+    サーバーが wsgi.file_wrapper を提供していれば sendfile でゼロコピー送信される。
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, application, index=None):
+        self.application = application
+        self.index = index or StaticFileIndex()
+
+    def __call__(self, environ, start_response):
+        static_file = self.index.find(environ.get("PATH_INFO", ""))
+        if static_file is None:
+            return self.application(environ, start_response)
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            start_response("405 Method Not Allowed", [("Allow", "GET, HEAD"), ("Content-Length", "0")])
+            return []
+
+        encoding, path, size = static_file.select(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        headers = static_file.response_headers(encoding, size)
+        if environ.get("HTTP_IF_NONE_MATCH") == dict(headers)["ETag"]:
+            start_response("304 Not Modified", not_modified_headers(headers))
+            return []
+        start_response("200 OK", headers)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return []
+        file = open(path, "rb")
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            return file_wrapper(file, self.chunk_size)
+        return iter_file(file, self.chunk_size)
+
+
+def iter_file(file, chunk_size):
+    with file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+class ASGIStaticFilesMiddleware:
+    """
+    StaticFilesMiddleware の ASGI 版。サーバーが http.response.zerocopysend 拡張に
+    対応していれば、ファイルをそのまま渡して送ってもらう。
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, application, index=None):
+        self.application = application
+        self.index = index or StaticFileIndex()
+
+    async def __call__(self, scope, receive, send):
+        static_file = self.index.find(scope["path"]) if scope["type"] == "http" else None
+        if static_file is None:
+            return await self.application(scope, receive, send)
+        if scope["method"] not in ("GET", "HEAD"):
+            await send_response(send, 405, [("Allow", "GET, HEAD"), ("Content-Length", "0")])
+            return
+
+        request_headers = dict(scope["headers"])
+        encoding, path, size = static_file.select(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        headers = static_file.response_headers(encoding, size)
+        if request_headers.get(b"if-none-match", b"").decode("latin-1") == dict(headers)["ETag"]:
+            await send_response(send, 304, not_modified_headers(headers))
+            return
+        if scope["method"] == "HEAD":
+            await send_response(send, 200, headers)
+            return
+
+        await send({"type": "http.response.start", "status": 200, "headers": encode_headers(headers)})
+        with open(path, "rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": file})
+                return
+            while True:
+                chunk = await asyncio.to_thread(file.read, self.chunk_size)
+                more_body = len(chunk) == self.chunk_size
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    break
+
+
+def encode_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+async def send_response(send, status, headers):
+    await send({"type": "http.response.start", "status": status, "headers": encode_headers(headers)})
+    await send({"type": "http.response.body", "body": b""})
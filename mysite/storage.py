@@ -0,0 +1,46 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli が無い環境では gzip だけを作る
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".map", ".svg", ".html", ".txt", ".json", ".xml", ".ico")
+
+
+def compress_variants(data):
+    """(拡張子, 圧縮後のデータ) を、元より小さくなったものだけ返す"""
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    return [(suffix, compressed) for suffix, compressed in variants if len(compressed) < len(data)]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ファイル名にハッシュを付けたうえで、collectstatic のときに .gz / .br を作っておく。
+    配信時に圧縮しなくて済むので、mysite.static はファイルをそのまま送るだけでよい。
+    """
+
+    min_compress_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < self.min_compress_size:
+            return
+        for suffix, compressed in compress_variants(data):
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,62 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def isolated_cache():
+    """
+    default のキャッシュを一時ディレクトリのファイルキャッシュに差し替える。
+    開発用の .cache や本番の Redis に書き込んだり、それを消したりしないようにする。
+    環境変数も差し替えるので、ブロック内で起動した子プロセスも同じキャッシュを使う
+    """
+    location = tempfile.mkdtemp(prefix="mysite-cache-")
+    caches = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": location,
+        }
+    }
+    environ = {name: os.environ.get(name) for name in ("DJANGO_CACHE_DIR", "REDIS_URL")}
+    os.environ["DJANGO_CACHE_DIR"] = location
+    os.environ.pop("REDIS_URL", None)
+    try:
+        with override_settings(CACHES=caches):
+            yield location
+    finally:
+        for name, value in environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(location, ignore_errors=True)
+
+
+def run_in_another_process(code):
+    """別のワーカーでの処理を再現するため、別プロセスで code を実行する。isolated_cache() の中で使う"""
+    subprocess.run(
+        [sys.executable, "-c", f"import django; django.setup(); {code}"],
+        cwd=settings.BASE_DIR,
+        env={"DJANGO_SETTINGS_MODULE": "mysite.settings", **os.environ},
+        check=True,
+    )
+
+
+class TestRunner(DiscoverRunner):
+    """テスト全体を isolated_cache() の中で実行する"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._isolated_cache = isolated_cache()
+        self._isolated_cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._isolated_cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
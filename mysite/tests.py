@@ -0,0 +1,197 @@
+import gzip
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from tweets import trending
+from tweets.models import TrendingSnapshot
+
+from .middleware import CompressionMiddleware, HtmlMinifyMiddleware, minify_html
+from .startup import probe
+from .static import IMMUTABLE_CACHE_CONTROL, StaticFileIndex, StaticFilesMiddleware
+from .warmup import warm_up
+
+
+def call_wsgi(application, path, **environ):
+    response = {}
+
+    def start_response(status, headers):
+        response["status"] = status
+        response["headers"] = dict(headers)
+
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, **environ}
+    response["body"] = b"".join(application(environ, start_response))
+    return response
+
+
+class TestStaticFiles(SimpleTestCase):
+    def setUp(self):
+        self.source = Path(tempfile.mkdtemp())
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        self.css = "body { color: red; }\n" * 100
+        (self.source / "site.css").write_text(self.css)
+        (self.source / "tiny.css").write_text("a{}")
+
+        settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command("collectstatic", interactive=False, verbosity=0, stdout=StringIO())
+        self.hashed_url = staticfiles_storage.url("site.css")
+        self.application = StaticFilesMiddleware(lambda environ, start_response: [b"django"], StaticFileIndex())
+
+    def test_collectstatic_precompresses(self):
+        hashed_name = staticfiles_storage.stored_name("site.css")
+        self.assertNotEqual(hashed_name, "site.css")
+        self.assertEqual(gzip.decompress((self.root / (hashed_name + ".gz")).read_bytes()).decode(), self.css)
+        self.assertFalse((self.root / "tiny.css.gz").exists())
+
+    def test_serve_hashed_file(self):
+        response = call_wsgi(self.application, self.hashed_url)
+        self.assertEqual(response["status"], "200 OK")
+        self.assertEqual(response["headers"]["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response["body"].decode(), self.css)
+
+    def test_serve_precompressed_file(self):
+        response = call_wsgi(self.application, self.hashed_url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(int(response["headers"]["Content-Length"]), len(response["body"]))
+        self.assertEqual(gzip.decompress(response["body"]).decode(), self.css)
+
+    def test_serve_with_quality_values(self):
+        response = call_wsgi(self.application, self.hashed_url, HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+        self.assertEqual(response["headers"]["Content-Encoding"], "gzip")
+        response = call_wsgi(self.application, self.hashed_url, HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertNotIn("Content-Encoding", response["headers"])
+        self.assertEqual(response["body"].decode(), self.css)
+
+    def test_not_modified(self):
+        etag = call_wsgi(self.application, self.hashed_url)["headers"]["ETag"]
+        response = call_wsgi(self.application, self.hashed_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response["status"], "304 Not Modified")
+        self.assertEqual(response["body"], b"")
+
+    def test_fall_through_to_django(self):
+        self.assertEqual(call_wsgi(self.application, "/static/missing.css")["body"], b"django")
+        self.assertEqual(call_wsgi(self.application, "/tweets/home/")["body"], b"django")
+
+
+class TestCompressionMiddleware(SimpleTestCase):
+    def setUp(self):
+        self.html = "<p>tweet</p>\n" * 200
+        self.request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+    def test_compress(self):
+        response = CompressionMiddleware(lambda request: HttpResponse(self.html))(self.request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content).decode(), self.html)
+
+    def test_not_compress_small_response(self):
+        response = CompressionMiddleware(lambda request: HttpResponse("<p>tweet</p>"))(self.request)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_not_compress_other_content_type(self):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(b"x" * 1000, content_type="image/png"))
+        self.assertFalse(middleware(self.request).has_header("Content-Encoding"))
+
+    def test_not_compress_without_accept_encoding(self):
+        request = RequestFactory().get("/")
+        response = CompressionMiddleware(lambda request: HttpResponse(self.html))(request)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_compress_with_quality_values(self):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.html))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+        self.assertEqual(middleware(request)["Content-Encoding"], "gzip")
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(middleware(request).has_header("Content-Encoding"))
+
+    def test_compress_streaming_response(self):
+        chunks = ["<p>tweet</p>\n" * 100 for _ in range(3)]
+        middleware = CompressionMiddleware(lambda request: StreamingHttpResponse(iter(chunks)))
+        response = middleware(self.request)
+        compressed = list(response.streaming_content)
+        self.assertGreater(len(compressed), 1)
+        self.assertEqual(gzip.decompress(b"".join(compressed)).decode(), "".join(chunks))
+
+
+class TestHtmlMinifyMiddleware(SimpleTestCase):
+    def test_minify(self):
+        html = "<div>\n    <p>a  b</p>\n\n    <pre>\n  code\n</pre>\n</div>\n"
+        self.assertEqual(minify_html(html), "<div>\n<p>a  b</p>\n<pre>\n  code\n</pre>\n</div>\n")
+
+    def test_minify_keeps_attribute_values(self):
+        html = '<div>\n    <p title="a\n    b">c</p>\n</div>\n'
+        self.assertEqual(minify_html(html), '<div>\n<p title="a\n    b">c</p>\n</div>\n')
+
+    def test_minify_only_html(self):
+        middleware = HtmlMinifyMiddleware(lambda request: HttpResponse("{\n    }", content_type="application/json"))
+        self.assertEqual(middleware(RequestFactory().get("/")).content, b"{\n    }")
+
+
+class TestIsolatedCache(SimpleTestCase):
+    def test_tests_do_not_use_shared_cache(self):
+        location = settings.CACHES["default"]["LOCATION"]
+        self.assertNotEqual(Path(location), settings.BASE_DIR / ".cache")
+        self.assertEqual(os.environ["DJANGO_CACHE_DIR"], location)
+        self.assertNotIn("REDIS_URL", os.environ)
+
+
+class TestStartup(SimpleTestCase):
+    def test_probe_worker_settings(self):
+        for entry, status in (("mysite.wsgi", "200 OK"), ("mysite.asgi", "200")):
+            result, _ = probe("mysite.settings_worker", entry, "/")
+            self.assertEqual(result["status"], status)
+            self.assertGreater(result["import"], 0)
+
+    def test_trending_not_imported_on_startup(self):
+        code = (
+            "import sys, mysite.wsgi; from django.urls import resolve; resolve('/tweets/home/'); "
+            "print('tweets.trending' in sys.modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+class TestGunicorn(TestCase):
+    def test_config(self):
+        config = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+        self.assertEqual(config["workers"], 2 * len(os.sched_getaffinity(0)) + 1)
+        self.assertTrue(config["preload_app"])
+        self.assertGreater(config["max_requests_jitter"], 0)
+
+    def test_worker_exit_flushes_trending(self):
+        worker_exit = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))["worker_exit"]
+        trending.reset_engine()
+        worker_exit(None, None)
+        self.assertFalse(TrendingSnapshot.objects.exists())
+
+        trending.get_engine().record({"django"})
+        worker_exit(None, None)
+        trending.reset_engine()
+        self.assertEqual([tag for tag, _ in trending.top_hashtags()], ["django"])
+
+    def test_warm_up(self):
+        loaded = warm_up()
+        self.assertIn("tweets/home.html", loaded)
+        self.assertIn("accounts/signup.html", loaded)
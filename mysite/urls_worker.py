@@ -0,0 +1,9 @@
+"""mysite.settings_worker 用の URL 設定 (管理画面を除いたもの)"""
+
+from django.urls import include, path
+
+urlpatterns = [
+    path("accounts/", include("accounts.urls")),
+    path("tweets/", include("tweets.urls")),
+    path("", include("welcome.urls")),
+]
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+
+def template_names(engine):
+    for directory in engine.template_dirs:
+        directory = Path(directory)
+        for path in directory.rglob("*.html"):
+            yield path.relative_to(directory).as_posix()
+
+
+def warm_up():
+    """
+    gunicorn の preload_app で、ワーカーを fork する前に親プロセスで一度だけ行う初期化。
+    ここで読み込んだものは copy-on-write で全ワーカーに共有されるので、各ワーカーの最初のリクエストが速くなる。
+    読み込んだテンプレート名を返す。
+    """
+    # URLconf を読み込んで、reverse() と resolve() の索引を作っておく
+    get_resolver()._populate()
+
+    # キャッシュ付きローダー (DEBUG でも Django 4.1 から既定で有効) にコンパイル済みのテンプレートを載せる
+    loaded = []
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                continue
+            loaded.append(name)
+
+    # DB に接続できることを確かめ、トレンドの集計状態をスナップショットから復元しておく
+    from tweets import trending
+
+    trending.get_engine()
+    return loaded
@@ -0,0 +1,13 @@
+import os
+
+
+def cpu_count():
+    # コンテナなどで使える CPU が制限されている場合は、その数を使う
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_workers():
+    """gunicorn のワーカー (プロセス) 数の既定値"""
+    return 2 * cpu_count() + 1
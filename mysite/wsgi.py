@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
 
 application = get_wsgi_application()
+
+from mysite.static import StaticFilesMiddleware  # noqa: E402
+
+# collectstatic 済みの STATIC_ROOT を Django を通さずに配信する
+application = StaticFilesMiddleware(application)
@@ -1,5 +1,7 @@
 from django.contrib import admin
 
-from .models import Tweet
+from .models import ArchivedTweet, TrendingSnapshot, Tweet
 
 admin.site.register(Tweet)
+admin.site.register(ArchivedTweet)
+admin.site.register(TrendingSnapshot)
@@ -0,0 +1,9 @@
+from django import forms
+
+from .models import Tweet
+
+
+class TweetForm(forms.ModelForm):
+    class Meta:
+        model = Tweet
+        fields = ("title", "content")
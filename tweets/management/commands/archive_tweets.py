@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tweets.models import Tweet
+
+
+class Command(BaseCommand):
+    help = "古いツイートを ArchivedTweet へ少しずつ移動します。途中で止めても次回は続きから処理します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.TWEET_ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--max-batches", type=int, default=None, help="1 回の実行で処理するバッチ数の上限")
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        total = batches = 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            moved = Tweet.objects.archive_batch(before, batch_size=options["batch_size"])
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            self.stdout.write(f"batch {batches}: {moved} 件を移動しました")
+        self.stdout.write(
+            self.style.SUCCESS(f"{before:%Y-%m-%d %H:%M} より前のツイートを {total} 件アーカイブしました")
+        )
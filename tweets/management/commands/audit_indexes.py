@@ -0,0 +1,136 @@
+import re
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from mysite import benchmarks
+from mysite.testing import isolated_cache
+from tweets.models import Tweet
+
+# (問題の種類, 実行計画の行にマッチする正規表現)。SQLite と PostgreSQL の EXPLAIN の表記に対応する
+PLAN_ISSUES = [
+    ("full scan", re.compile(r"^SCAN (?P<table>\w+)$")),
+    ("full scan", re.compile(r"Seq Scan on (?P<table>\w+)")),
+    ("sort without index", re.compile(r"USE TEMP B-TREE FOR (ORDER|GROUP) BY")),
+    ("sort without index", re.compile(r"^(->\s*)?(Incremental )?Sort\b")),
+]
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+CLAUSE_RE = re.compile(r"\b(WHERE|ORDER BY)\b(.*?)(?=\bORDER BY\b|\bLIMIT\b|\bUNION\b|\)\s*$|$)", re.S)
+
+
+@contextmanager
+def capture_statements(statements):
+    """実行された SQL を、EXPLAIN できるようにパラメータと組で記録する"""
+
+    def record(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(EXPLAINABLE):
+            statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        yield
+
+
+def explain(sql, params):
+    """実行計画を 1 ノード 1 行のテキストで返す"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        return [str(row[-1]).strip() for row in cursor.fetchall()]
+
+
+def plan_issues(plan):
+    issues = []
+    for line in plan:
+        for kind, pattern in PLAN_ISSUES:
+            if pattern.search(line):
+                issues.append((kind, line))
+                break
+    return issues
+
+
+def index_hint(sql):
+    """インデックスの候補になる WHERE と ORDER BY の条件を取り出す"""
+    return " / ".join(f"{clause} {' '.join(body.split())}" for clause, body in CLAUSE_RE.findall(sql))
+
+
+class Command(BaseCommand):
+    help = (
+        "データを投入したうえで tweets と accounts の各ビューが発行するクエリの実行計画 (EXPLAIN) を調べ、"
+        "全件スキャンとインデックスを使わないソートを報告します。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--tweets", type=int, default=20000)
+        parser.add_argument("--fail", action="store_true", help="問題が見つかったら終了コード 1 で終了する")
+
+    def handle(self, *args, **options):
+        # プロフィールページはユーザー ID とページをキャッシュするので、ロールバックしたユーザーの分が
+        # 共有のキャッシュに残らないよう使い捨てのキャッシュで調べる
+        with benchmarks.rollback(), isolated_cache():
+            users = benchmarks.seed(users=options["users"], tweets=options["tweets"])
+            results = [(name, self.audit(user, send)) for name, user, send in self.requests(users)]
+
+        total = 0
+        for name, statements in results:
+            self.stdout.write(f"{name} ({len(statements)} queries)")
+            for sql, plan, issues in statements:
+                if options["verbosity"] >= 2:
+                    self.stdout.write(f"  {sql}")
+                    for line in plan:
+                        self.stdout.write(f"    {line}")
+                for kind, line in issues:
+                    total += 1
+                    self.stdout.write(self.style.WARNING(f"  {kind}: {line}"))
+                    self.stdout.write(f"    index candidate: {index_hint(sql) or '-'}")
+        if total:
+            message = f"{total} 件の問題が見つかりました。"
+            if options["fail"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("全件スキャンとインデックスを使わないソートは見つかりませんでした。"))
+
+    def requests(self, users):
+        """(名前, ログインするユーザー, クライアントを受け取ってリクエストを送る関数) を返す"""
+        author, other = users[0], users[1]
+        tweet = Tweet.objects.filter(user=author).first()
+        deleted = Tweet.objects.filter(user=author).last()
+        archived = Tweet.objects.filter(user=other).order_by("created_at").first()
+        Tweet.objects.filter(pk=archived.pk).archive_batch(timezone.now())
+
+        def get(name, *args):
+            return lambda client: client.get(reverse(name, args=args))
+
+        signup = {
+            "username": "audit",
+            "email": "audit@example.com",
+            "password1": "audit-password-1234",
+            "password2": "audit-password-1234",
+        }
+        return [
+            ("tweets:home", author, get("tweets:home")),
+            ("tweets:detail", author, get("tweets:detail", tweet.pk)),
+            ("tweets:detail (archived)", author, get("tweets:detail", archived.pk)),
+            ("tweets:delete GET", author, get("tweets:delete", tweet.pk)),
+            ("tweets:delete POST", author, lambda client: client.post(reverse("tweets:delete", args=[deleted.pk]))),
+            ("accounts:user_profile", author, get("accounts:user_profile", other.username)),
+            ("accounts:user_profile (anonymous)", None, get("accounts:user_profile", other.username)),
+            ("accounts:signup POST", None, lambda client: client.post(reverse("accounts:signup"), signup)),
+        ]
+
+    def audit(self, user, send):
+        client = benchmarks.client(user)
+        statements = []
+        with capture_statements(statements):
+            send(client)
+        audited = []
+        for sql, params in statements:
+            plan = explain(sql, params)
+            audited.append((sql, plan, plan_issues(plan)))
+        return audited
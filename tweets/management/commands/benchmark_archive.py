@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mysite import benchmarks
+from tweets.models import ArchivedTweet, Tweet
+
+
+class Command(BaseCommand):
+    help = "ツイートの総数を増やしながら、アーカイブ前後のホームのクエリと、2 層にまたがる読み込みのレイテンシを計測します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+        parser.add_argument("--days", type=int, default=30, help="この日数より古いツイートをアーカイブする")
+        parser.add_argument("--spread-days", type=int, default=730, help="ツイートを投稿日時でばらす期間")
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'total':>8}{'hot':>8}{'home before(ms)':>17}{'home after(ms)':>16}{'profile(ms)':>13}{'detail(ms)':>12}"
+        )
+        for size in options["sizes"]:
+            with benchmarks.rollback():
+                user = benchmarks.seed(users=100, tweets=size, spread=timedelta(days=options["spread_days"]))[0]
+                before = self.measure(lambda: list(Tweet.objects.rows()), options["repeat"])
+
+                cutoff = timezone.now() - timedelta(days=options["days"])
+                while Tweet.objects.archive_batch(cutoff, batch_size=5000):
+                    pass
+                after = self.measure(lambda: list(Tweet.objects.rows()), options["repeat"])
+
+                hot = Tweet.objects.filter(user=user).order_by().rows()
+                cold = ArchivedTweet.objects.filter(user=user).order_by().rows()
+                timeline = hot.union(cold, all=True).order_by("-created_at")
+                profile = self.measure(lambda: list(timeline.all()), options["repeat"])
+
+                archived_pk = ArchivedTweet.objects.values_list("pk", flat=True).first()
+                detail = self.measure(lambda: self.get_detail(archived_pk), options["repeat"])
+                self.stdout.write(
+                    f"{size:>8}{Tweet.objects.count():>8}{before:>17.2f}{after:>16.2f}{profile:>13.2f}{detail:>12.3f}"
+                )
+
+    def measure(self, func, repeat):
+        return benchmarks.measure(func, repeat=repeat)[0] * 1000
+
+    def get_detail(self, pk):
+        # TweetDetailView.get_object と同じく、ホットテーブルで見つからなければアーカイブを探す
+        tweet = Tweet.objects.select_related("user").filter(pk=pk).first()
+        if tweet is None:
+            tweet = ArchivedTweet.objects.select_related("user").get(pk=pk)
+        return tweet
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.text import compress_string
+
+from mysite import benchmarks
+from mysite.middleware import brotli, minify_html
+
+
+class Command(BaseCommand):
+    help = (
+        "ホームのタイムラインについて、HTML の最小化と圧縮で減るバイト数と 1 レスポンスあたりの CPU 時間を計測します。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'tweets':>7}  {'stage':<18}{'bytes':>10}{'saved':>8}{'cpu(ms)':>10}")
+        for size in options["sizes"]:
+            with benchmarks.rollback():
+                user = benchmarks.seed(users=10, tweets=size)[0]
+                with override_settings(HTML_MINIFY=False):
+                    html = benchmarks.client(user).get(reverse("tweets:home")).content
+                minified = minify_html(html.decode()).encode()
+                stages = [
+                    ("raw", lambda: html),
+                    ("minify", lambda: minify_html(html.decode()).encode()),
+                    ("gzip", lambda: compress_string(html)),
+                    ("minify + gzip", lambda: compress_string(minify_html(html.decode()).encode())),
+                ]
+                if brotli is not None:
+                    stages.append(("minify + br", lambda: brotli.compress(minified, quality=4)))
+                for name, func in stages:
+                    body, seconds = self.run(func, options["repeat"])
+                    saved = 1 - len(body) / len(html)
+                    self.stdout.write(f"{size:>7}  {name:<18}{len(body):>10}{saved:>8.1%}{seconds * 1000:>10.3f}")
+
+    def run(self, func, repeat):
+        started = time.process_time()
+        for _ in range(repeat):
+            body = func()
+        return body, (time.process_time() - started) / repeat
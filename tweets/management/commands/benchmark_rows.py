@@ -0,0 +1,43 @@
+import gc
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from mysite import benchmarks
+from tweets.models import Tweet
+
+
+class Command(BaseCommand):
+    help = "タイムラインの読み込みについて、モデルインスタンスと TweetRow のメモリと CPU 時間を比較します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+        parser.add_argument("--users", type=int, default=100)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>8}  {'loader':<16}{'peak memory(MiB)':>18}{'cpu(ms)':>10}")
+        for size in options["sizes"]:
+            with benchmarks.rollback():
+                benchmarks.seed(users=options["users"], tweets=size)
+                loaders = [
+                    ("select_related", lambda: list(Tweet.objects.select_related("user"))),
+                    ("rows", lambda: list(Tweet.objects.rows())),
+                ]
+                for name, loader in loaders:
+                    memory, seconds = self.run(loader)
+                    self.stdout.write(f"{size:>8}  {name:<16}{memory / 2**20:>18.2f}{seconds * 1000:>10.1f}")
+
+    def run(self, loader):
+        # tracemalloc を有効にすると遅くなるので、CPU 時間とメモリは別々に計測する
+        gc.collect()
+        started = time.process_time()
+        loader()
+        seconds = time.process_time() - started
+
+        gc.collect()
+        tracemalloc.start()
+        loader()
+        memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return memory, seconds
@@ -0,0 +1,151 @@
+import http.client
+import itertools
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from mysite import benchmarks
+from mysite.benchmarks import User
+from mysite.workers import cpu_count, default_workers
+from tweets.models import Tweet
+
+
+def worker_counts():
+    # gunicorn.conf.py の既定値 (2 * コア数 + 1) と、その前後の値を比べる
+    return sorted({1, cpu_count(), default_workers()})
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """gunicorn.conf.py の設定で gunicorn を起動し、ワーカー数とスレッド数だけを差し替える"""
+
+    def __init__(self, workers, threads):
+        self.port = free_port()
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                *("-m", "gunicorn", "--config", "gunicorn.conf.py"),
+                *("--bind", f"127.0.0.1:{self.port}", "--workers", str(workers), "--threads", str(threads)),
+            ],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def wait_ready(self, path, headers, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError("gunicorn が起動できませんでした。")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+                connection.request("GET", path, headers=headers)
+                status = connection.getresponse().status
+                connection.close()
+                if status != 200:
+                    raise CommandError(f"{path} が {status} を返しました。")
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError("gunicorn の起動がタイムアウトしました。")
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait()
+
+
+def load(port, path, headers, concurrency, duration):
+    """concurrency 本のスレッドで duration 秒間リクエストを送り続け、(各レスポンスの秒数, エラー数) を返す"""
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + duration
+
+    def run():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        own_latencies, own_errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                # max_requests でワーカーが入れ替わると接続が切られるので、次のリクエストで接続し直す
+                connection.close()
+                own_errors += 1
+                continue
+            if response.status != 200:
+                own_errors += 1
+                continue
+            own_latencies.append(time.perf_counter() - started)
+            if response.will_close:
+                connection.close()
+        connection.close()
+        latencies.extend(own_latencies)
+        errors.append(own_errors)
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors)
+
+
+class Command(BaseCommand):
+    help = "gunicorn のワーカー数とスレッド数の組み合わせごとに、tweets:home のスループットとレイテンシを計測します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, nargs="+", default=worker_counts())
+        parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=5.0)
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--tweets", type=int, default=200)
+
+    def handle(self, *args, **options):
+        # サーバーは別プロセスなので、ロールバックせずにコミットしたデータを使い、最後に削除する
+        users = benchmarks.seed(users=options["users"], tweets=options["tweets"])
+        client = benchmarks.client(users[0])
+        try:
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            headers = {"Host": "localhost", "Cookie": f"{settings.SESSION_COOKIE_NAME}={session}"}
+            self.run_matrix(reverse("tweets:home"), headers, options)
+        finally:
+            client.logout()
+            Tweet.objects.filter(user__in=users).delete_rows()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def run_matrix(self, path, headers, options):
+        self.stdout.write(
+            f"concurrency={options['concurrency']} duration={options['duration']}s "
+            f"tweets={options['tweets']} cores={cpu_count()}"
+        )
+        self.stdout.write(f"{'workers':>8}{'threads':>8}{'req/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'errors':>8}")
+        for workers, threads in itertools.product(options["workers"], options["threads"]):
+            server = Server(workers, threads)
+            try:
+                server.wait_ready(path, headers)
+                latencies, errors = load(server.port, path, headers, options["concurrency"], options["duration"])
+            finally:
+                server.stop()
+            if latencies:
+                p50 = statistics.median(latencies) * 1000
+                p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else p50
+            else:
+                p50 = p99 = float("nan")
+            rate = len(latencies) / options["duration"]
+            self.stdout.write(f"{workers:>8}{threads:>8}{rate:>10.1f}{p50:>10.1f}{p99:>10.1f}{errors:>8}")
@@ -0,0 +1,56 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from tweets.trending import TrendingEngine
+
+
+class Command(BaseCommand):
+    help = "トレンド集計の精度とメモリ使用量を、正確なカウントと Count-Min Sketch で比較します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=100000)
+        parser.add_argument("--tags", type=int, default=20000)
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--zipf", type=float, default=1.1)
+        parser.add_argument("--widths", type=int, nargs="+", default=[256, 1024, 4096])
+        parser.add_argument("--depth", type=int, default=4)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        vocabulary = [f"tag{i}" for i in range(options["tags"])]
+        weights = [1 / (rank + 1) ** options["zipf"] for rank in range(len(vocabulary))]
+        # 1 時間分の投稿が一様に届く想定
+        events = rng.choices(vocabulary, weights=weights, k=options["events"])
+        step = 3600 / len(events)
+
+        exact, exact_memory, exact_seconds = self.run(events, step, counter="exact")
+        exact_top = exact.top(options["top"], now=3600)
+        exact_scores = dict(exact.top(len(vocabulary), now=3600))
+        self.stdout.write(f"{'counter':<18}{'memory(KiB)':>14}{'ingest(s)':>12}{'recall@k':>10}{'rel.err':>10}")
+        self.stdout.write(f"{'exact':<18}{exact_memory / 1024:>14.1f}{exact_seconds:>12.3f}{1.0:>10.2f}{0.0:>10.4f}")
+
+        expected = {tag for tag, _ in exact_top}
+        for width in options["widths"]:
+            engine, memory, seconds = self.run(events, step, counter="sketch", width=width, depth=options["depth"])
+            top = engine.top(options["top"], now=3600)
+            recall = len(expected & {tag for tag, _ in top}) / len(expected)
+            errors = [abs(engine._score(tag, 3600) - exact_scores[tag]) / exact_scores[tag] for tag in expected]
+            label = f"sketch {width}x{options['depth']}"
+            self.stdout.write(
+                f"{label:<18}{memory / 1024:>14.1f}{seconds:>12.3f}{recall:>10.2f}{sum(errors) / len(errors):>10.4f}"
+            )
+
+    def run(self, events, step, **options):
+        tracemalloc.start()
+        started = time.perf_counter()
+        engine = TrendingEngine(**options)
+        for i, tag in enumerate(events):
+            engine.record({tag}, now=i * step)
+        seconds = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return engine, memory, seconds
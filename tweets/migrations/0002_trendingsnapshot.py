@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tweets", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingSnapshot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("payload", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
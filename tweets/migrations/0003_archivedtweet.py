@@ -0,0 +1,41 @@
+# Generated by Django 4.1.13 on 2026-10-19 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("tweets", "0002_trendingsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTweet",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=100)),
+                ("content", models.TextField(max_length=100)),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_tweets",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="archivedtweet",
+            index=models.Index(fields=["user", "-created_at"], name="tweets_archived_user_created"),
+        ),
+    ]
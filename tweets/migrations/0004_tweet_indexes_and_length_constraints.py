@@ -0,0 +1,69 @@
+# Generated by Django 4.1.13 on 2026-10-19 11:15
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+import django.db.models.lookups
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("tweets", "0003_archivedtweet"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="archivedtweet",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_tweets",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tweet",
+            name="content",
+            field=models.TextField(max_length=100, validators=[django.core.validators.MaxLengthValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name="tweet",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tweet",
+            index=models.Index(fields=["-created_at"], name="tweets_tweet_created"),
+        ),
+        migrations.AddIndex(
+            model_name="tweet",
+            index=models.Index(fields=["user", "-created_at"], name="tweets_tweet_user_created"),
+        ),
+        migrations.AddConstraint(
+            model_name="archivedtweet",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    django.db.models.lookups.LessThanOrEqual(django.db.models.functions.text.Length("title"), 100),
+                    django.db.models.lookups.LessThanOrEqual(django.db.models.functions.text.Length("content"), 100),
+                ),
+                name="tweets_archived_length",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tweet",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    django.db.models.lookups.LessThanOrEqual(django.db.models.functions.text.Length("title"), 100),
+                    django.db.models.lookups.LessThanOrEqual(django.db.models.functions.text.Length("content"), 100),
+                ),
+                name="tweets_tweet_length",
+            ),
+        ),
+    ]
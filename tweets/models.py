@@ -1,15 +1,136 @@
 from django.conf import settings
-from django.db import models
+from django.core.validators import MaxLengthValidator
+from django.db import models, transaction
+from django.db.models.functions import Length
+from django.db.models.lookups import LessThanOrEqual
+
+from mysite.pagecache import invalidate_tags, user_tag
+
+from .rows import TweetRow, TweetRowIterable
+
+
+class TweetRowQuerySet(models.QuerySet):
+    def rows(self):
+        """表示に使う列だけを読み込み、モデルの代わりに TweetRow を返す"""
+        queryset = self.values_list(*TweetRow.fields)
+        queryset._iterable_class = TweetRowIterable
+        return queryset
+
+    def delete_rows(self, user_ids=()):
+        """
+        DELETE ... WHERE ... の 1 文で削除し、削除した件数を返す。シグナルを送らず、関連オブジェクトの
+        CASCADE も行わないので、このモデルを参照するモデルがあるときは使えない。
+        user_ids の投稿者のページキャッシュは、削除がコミットされてから無効化する。
+        """
+        if self.query.is_sliced or self.query.distinct or self.query.combinator:
+            raise TypeError("スライスや distinct()、union() などをした QuerySet は delete_rows() で削除できません。")
+        if self.model._meta.related_objects:
+            raise TypeError(f"{self.model.__name__} を参照するモデルがあるので、delete_rows() では削除できません。")
+        deleted = self._raw_delete(self.db)
+        if deleted and user_ids:
+            tags = [user_tag(user_id) for user_id in user_ids]
+            transaction.on_commit(lambda: invalidate_tags(*tags), using=self.db)
+        return deleted
+
+
+class TweetQuerySet(TweetRowQuerySet):
+    def delete_owned(self, pk, user):
+        """
+        pk と投稿者の両方が一致するツイートを DELETE ... WHERE id = ? AND user_id = ? の 1 文で削除し、
+        削除した件数を返す。投稿者のページキャッシュも無効化する (delete_rows() を参照)。
+        """
+        return self.filter(pk=pk, user=user).delete_rows(user_ids=[user.pk])
+
+    def archive_batch(self, before, batch_size=1000):
+        """
+        created_at が before より古いツイートを古い順に最大 batch_size 件 ArchivedTweet へ移し、
+        移した件数を返す。1 バッチごとにコミットするので、途中で止めても続きから再開できる。
+        """
+        with transaction.atomic(using=self.db):
+            # 移す行をロックしておき、同時に動いている archive_batch() はロック中の行を飛ばす。
+            # 削除 (delete_owned) もロックが外れるまで待つので、削除したツイートがアーカイブに残ることはない
+            tweets = list(
+                self.select_for_update(skip_locked=True)
+                .filter(created_at__lt=before)
+                .order_by("created_at")
+                .values("id", "title", "content", "user_id", "created_at")[:batch_size]
+            )
+            if not tweets:
+                return 0
+            ArchivedTweet.objects.using(self.db).bulk_create([ArchivedTweet(**tweet) for tweet in tweets])
+            # 移動しても表示内容は変わらないので、ページキャッシュは無効化しない
+            return self.filter(pk__in=[tweet["id"] for tweet in tweets]).delete_rows()
+
+
+def length_constraint(name):
+    """title と content の長さを DB でも 100 文字以内に制限する (SQLite は varchar の長さを強制しないため)"""
+    return models.CheckConstraint(
+        check=LessThanOrEqual(Length("title"), 100) & LessThanOrEqual(Length("content"), 100),
+        name=name,
+    )
 
 
 class Tweet(models.Model):
     title = models.CharField(max_length=100)
-    content = models.TextField(max_length=100)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    content = models.TextField(max_length=100, validators=[MaxLengthValidator(100)])
+    # user_id だけの検索は (user, -created_at) のインデックスで足りるので、単独のインデックスは作らない
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TweetQuerySet.as_manager()
+
+    is_archived = False
+
     def __str__(self):
         return str(self.content)
 
+    def validate_constraints(self, exclude=None):
+        # 長さの制約は clean_fields() の MaxLengthValidator と同じ条件なので、
+        # フォームの検証ごとに DB へ問い合わせないよう対象から外す
+        super().validate_constraints(exclude={*(exclude or ()), "title", "content"})
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # tweets:home の ORDER BY created_at DESC
+            models.Index(fields=["-created_at"], name="tweets_tweet_created"),
+            # accounts:user_profile の WHERE user_id = ? ORDER BY created_at DESC
+            models.Index(fields=["user", "-created_at"], name="tweets_tweet_user_created"),
+        ]
+        constraints = [length_constraint("tweets_tweet_length")]
+
+
+class ArchivedTweet(models.Model):
+    """
+    Tweet から移された古いツイート。id は元の Tweet のものをそのまま使うので、
+    URL (tweets:detail) は移動後も変わらない。
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=100)
+    content = models.TextField(max_length=100)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_tweets", db_index=False
+    )
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TweetRowQuerySet.as_manager()
+
+    is_archived = True
+
+    def __str__(self):
+        return str(self.content)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["user", "-created_at"], name="tweets_archived_user_created")]
+        constraints = [length_constraint("tweets_archived_length")]
+
+
+class TrendingSnapshot(models.Model):
+    payload = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.updated_at)
@@ -0,0 +1,58 @@
+from django.db.models.query import BaseIterable, ValuesListIterable
+
+TWEET_MODELS = ("tweets.Tweet", "tweets.ArchivedTweet")
+
+
+class AuthorRow:
+    __slots__ = ("username",)
+
+    def __init__(self, username):
+        self.username = username
+
+    def __str__(self):
+        return self.username
+
+
+class TweetRow:
+    """
+    タイムライン表示用の読み取り専用レコード。テンプレートから Tweet と同じように
+    tweet.pk / tweet.title / tweet.content / tweet.user.username で参照できる。
+    """
+
+    __slots__ = ("pk", "title", "content", "created_at", "user")
+    fields = ("pk", "title", "content", "created_at", "user__username")
+
+    def __init__(self, pk, title, content, created_at, user):
+        self.pk = pk
+        self.title = title
+        self.content = content
+        self.created_at = created_at
+        self.user = user
+
+    @property
+    def id(self):
+        return self.pk
+
+    def __str__(self):
+        return str(self.content)
+
+    def __eq__(self, other):
+        # Tweet / ArchivedTweet のインスタンスとも pk で比較できるようにする
+        # (models が rows を読み込むので、モデルクラスではなくラベルで判定する)
+        if isinstance(other, TweetRow) or getattr(getattr(other, "_meta", None), "label", None) in TWEET_MODELS:
+            return self.pk is not None and self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class TweetRowIterable(BaseIterable):
+    def __iter__(self):
+        # 同じ投稿者の AuthorRow は使い回す
+        authors = {}
+        for pk, title, content, created_at, username in ValuesListIterable(self.queryset):
+            author = authors.get(username)
+            if author is None:
+                author = authors[username] = AuthorRow(username)
+            yield TweetRow(pk, title, content, created_at, author)
@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from mysite.pagecache import invalidate_tags, user_tag
+
+from .models import Tweet
+
+# bulk_create は post_save を送らないので、まとめて作成したときはこちらを 1 回だけ送る
+tweets_bulk_created = Signal()
+
+
+@receiver(post_save, sender=Tweet)
+def record_trending_hashtags(sender, instance, created, using, **kwargs):
+    if created:
+        # トレンド集計は初めてツイートが作られたときに読み込む (ワーカーの起動を軽くするため)
+        from . import trending
+
+        # ロールバックされたツイートを数えないよう、コミットされてから記録する
+        transaction.on_commit(lambda: trending.record_tweets([instance]), using=using)
+
+
+@receiver(post_save, sender=Tweet)
+@receiver(post_delete, sender=Tweet)
+def invalidate_user_pages(sender, instance, using, **kwargs):
+    # コミット前に無効化すると、その間のリクエストが古い内容をキャッシュし直してしまう
+    transaction.on_commit(lambda: invalidate_tags(user_tag(instance.user_id)), using=using)
+
+
+@receiver(tweets_bulk_created)
+def record_bulk_trending_hashtags(sender, tweets, **kwargs):
+    from . import trending
+
+    transaction.on_commit(lambda: trending.record_tweets(tweets))
+
+
+@receiver(tweets_bulk_created)
+def invalidate_bulk_user_pages(sender, tweets, **kwargs):
+    tags = {user_tag(tweet.user_id) for tweet in tweets}
+    transaction.on_commit(lambda: invalidate_tags(*tags))
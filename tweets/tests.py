@@ -1,9 +1,20 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from accounts.forms import User
+from mysite.pagecache import tag_versions, user_tag
 
-from .models import Tweet
+from . import trending
+from .forms import TweetForm
+from .models import ArchivedTweet, TrendingSnapshot, Tweet
+from .rows import TweetRow
 
 
 class TestHomeView(TestCase):
@@ -18,6 +29,32 @@ class TestHomeView(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertQuerysetEqual(response.context["object_list"], Tweet.objects.all())
 
+    def test_success_get_with_rows(self):
+        tweet = Tweet.objects.create(user=self.user, title="test", content="test tweet")
+        response = self.client.get(self.url)
+        row = response.context["tweets"][0]
+        self.assertIsInstance(row, TweetRow)
+        self.assertEqual((row.pk, row.title, row.user.username), (tweet.pk, "test", "testuser"))
+        self.assertContains(response, reverse("accounts:user_profile", args=["testuser"]))
+        self.assertContains(response, reverse("tweets:detail", args=[tweet.pk]))
+
+    def test_row_equality(self):
+        tweet = Tweet.objects.create(user=self.user, title="test", content="test tweet")
+        row = Tweet.objects.rows().get()
+        self.assertEqual(row, tweet)
+        self.assertEqual(row, ArchivedTweet(id=tweet.pk))
+        self.assertNotEqual(row, User(pk=tweet.pk))
+
+    def test_success_get_with_trending(self):
+        trending.reset_engine()
+        with self.captureOnCommitCallbacks(execute=True):
+            Tweet.objects.create(user=self.user, title="#django", content="#python")
+            Tweet.objects.create(user=self.user, title="test", content="#Python #django")
+            Tweet.objects.create(user=self.user, title="test", content="#python")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tag for tag, _ in response.context["trending"]], ["python", "django"])
+
 
 class TestTweetCreateView(TestCase):
     def setUp(self):
@@ -57,6 +94,70 @@ class TestTweetCreateView(TestCase):
         self.assertFalse(Tweet.objects.exists())
 
 
+@override_settings(TRENDING_SNAPSHOT_INTERVAL=10**10, TWEET_BATCH_MAX_SIZE=3)
+class TestTweetBatchCreateView(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.url = reverse("tweets:batch_create")
+        trending.reset_engine()
+        trending.get_engine()
+
+    def post(self, tweets):
+        return self.client.post(self.url, {"tweets": tweets}, content_type="application/json")
+
+    def test_success_post(self):
+        version = tag_versions([user_tag(self.user.pk)])
+        # セッション、ログインユーザー、INSERT 1 回
+        with self.assertNumQueries(3), self.captureOnCommitCallbacks(execute=True):
+            response = self.post([{"title": "a", "content": "#batch 1"}, {"title": "b", "content": "#batch 2"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 2)
+        ids = [result["id"] for result in response.json()["results"]]
+        self.assertQuerysetEqual(Tweet.objects.filter(user=self.user).order_by("id"), ids, transform=lambda t: t.pk)
+        self.assertNotEqual(tag_versions([user_tag(self.user.pk)]), version)
+        self.assertEqual(trending.top_hashtags(), [("batch", 2.0)])
+
+    def test_success_post_with_invalid_tweet(self):
+        response = self.post([{"title": "a", "content": "n" * 101}, {"title": "b", "content": "ok"}])
+        self.assertEqual(response.status_code, 201)
+        results = response.json()["results"]
+        self.assertFalse(results[0]["ok"])
+        self.assertIn("content", results[0]["errors"])
+        self.assertTrue(results[1]["ok"])
+        self.assertQuerysetEqual(Tweet.objects.all(), ["ok"], transform=lambda t: t.content)
+
+    def test_failure_post_with_only_invalid_tweets(self):
+        response = self.post([{"title": "", "content": "test"}, "not a tweet"])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["created"], 0)
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_failure_post_with_too_many_tweets(self):
+        response = self.post([{"title": "a", "content": "test"}] * 4)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_failure_post_with_invalid_json(self):
+        response = self.client.post(self.url, "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_failure_post_with_anonymous_user(self):
+        self.client.logout()
+        response = self.post([{"title": "a", "content": "test"}])
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("error", response.json())
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_failure_post_without_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        data = {"tweets": [{"title": "a", "content": "test"}]}
+        response = client.post(self.url, data, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Tweet.objects.exists())
+
+
 class TestTweetDetailView(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
@@ -65,7 +166,9 @@ class TestTweetDetailView(TestCase):
         self.url = reverse("tweets:detail", kwargs={"pk": self.tweet.pk})
 
     def test_success_get(self):
-        response = self.client.get(self.url)
+        # セッション、ログインユーザー、投稿者付きのツイート
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context["tweet"], self.tweet)
 
@@ -83,22 +186,189 @@ class TestTweetDeleteView(TestCase):
         self.url = reverse("tweets:delete", kwargs={"pk": self.tweet.pk})
         self.url2 = reverse("tweets:delete", kwargs={"pk": self.tweet2.pk})
 
+    def test_success_get(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["tweet"], self.tweet)
+
+    def test_failure_get_with_incorrect_user(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url2)
+        self.assertEqual(response.status_code, 403)
+
     def test_success_post(self):
-        response = self.client.post(self.url)
+        version = tag_versions([user_tag(self.user.pk)])
+        # セッション、ログインユーザー、条件付き DELETE
+        with self.assertNumQueries(3), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
         self.assertRedirects(response, reverse("tweets:home"), status_code=302, target_status_code=200)
         self.assertEqual(Tweet.objects.filter(content="tweet").count(), 0)
+        self.assertNotEqual(tag_versions([user_tag(self.user.pk)]), version)
+
+    def test_delete_rows_rejects_sliced_queryset(self):
+        with self.assertRaises(TypeError):
+            Tweet.objects.all()[:1].delete_rows()
+        self.assertEqual(Tweet.objects.count(), 2)
 
     def test_failure_post_with_not_exist_tweet(self):
-        response = self.client.post(reverse("tweets:delete", kwargs={"pk": 3}))
+        # セッション、ログインユーザー、条件付き DELETE 2 つ (Tweet と ArchivedTweet)、存在確認 2 つ
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse("tweets:delete", kwargs={"pk": 3}))
         self.assertEqual(response.status_code, 404)
         self.assertEqual(Tweet.objects.count(), 2)
 
     def test_failure_post_with_incorrect_user(self):
-        response = self.client.post(self.url2)
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url2)
         self.assertEqual(response.status_code, 403)
         self.assertEqual(Tweet.objects.count(), 2)
 
 
+class TestArchiveTweets(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.old_tweet = Tweet.objects.create(user=self.user, title="old", content="oldtweet")
+        self.new_tweet = Tweet.objects.create(user=self.user, title="new", content="newtweet")
+        Tweet.objects.filter(pk=self.old_tweet.pk).update(created_at=timezone.now() - timedelta(days=100))
+
+    def test_archive_command(self):
+        call_command("archive_tweets", days=90, batch_size=1, stdout=StringIO())
+        self.assertQuerysetEqual(Tweet.objects.all(), [self.new_tweet])
+        self.assertQuerysetEqual(ArchivedTweet.objects.values_list("pk", flat=True), [self.old_tweet.pk])
+
+    def test_success_get_archived_tweet(self):
+        call_command("archive_tweets", days=90, stdout=StringIO())
+        response = self.client.get(reverse("tweets:detail", kwargs={"pk": self.old_tweet.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["tweet"].is_archived)
+        self.assertContains(response, reverse("tweets:delete", kwargs={"pk": self.old_tweet.pk}))
+
+    def test_success_delete_archived_tweet(self):
+        call_command("archive_tweets", days=90, stdout=StringIO())
+        url = reverse("tweets:delete", kwargs={"pk": self.old_tweet.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["tweet"].is_archived)
+
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse("tweets:home"), status_code=302, target_status_code=200)
+        self.assertFalse(ArchivedTweet.objects.exists())
+
+    def test_failure_delete_archived_tweet_with_incorrect_user(self):
+        call_command("archive_tweets", days=90, stdout=StringIO())
+        User.objects.create_user(username="testuser2", email="test2@example.com", password="testpassword")
+        self.client.login(username="testuser2", password="testpassword")
+        url = reverse("tweets:delete", kwargs={"pk": self.old_tweet.pk})
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.post(url).status_code, 403)
+        self.assertTrue(ArchivedTweet.objects.exists())
+
+    def test_success_get_user_profile_with_archived_tweet(self):
+        call_command("archive_tweets", days=90, stdout=StringIO())
+        response = self.client.get(reverse("accounts:user_profile", args=["testuser"]))
+        self.assertEqual([tweet.pk for tweet in response.context["tweets"]], [self.new_tweet.pk, self.old_tweet.pk])
+
+        response = self.client.get(reverse("tweets:home"))
+        self.assertEqual([tweet.pk for tweet in response.context["tweets"]], [self.new_tweet.pk])
+
+
+class TestTweetConstraints(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+
+    def test_failure_create_with_too_long_content(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tweet.objects.create(user=self.user, title="test", content="n" * 101)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ArchivedTweet.objects.create(
+                id=1, user=self.user, title="n" * 101, content="test", created_at=timezone.now()
+            )
+
+    def test_form_validation_without_constraint_query(self):
+        form = TweetForm({"title": "test", "content": "testtweet"})
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+
+    def test_audit_indexes(self):
+        out = StringIO()
+        call_command("audit_indexes", users=5, tweets=50, fail=True, stdout=out)
+        self.assertIn("tweets:home", out.getvalue())
+
+
+class TestTrendingEngine(TestCase):
+    def setUp(self):
+        trending.reset_engine()
+
+    def test_window_expiry(self):
+        engine = trending.TrendingEngine(bucket_seconds=60, window_buckets=2)
+        engine.record({"old"}, now=0)
+        engine.record({"new"}, now=60)
+        self.assertEqual([tag for tag, _ in engine.top(now=60)], ["new", "old"])
+        self.assertEqual([tag for tag, _ in engine.top(now=120)], ["new"])
+
+    def test_sketch_never_underestimates(self):
+        engine = trending.TrendingEngine(counter="sketch", width=16, depth=2)
+        for i in range(100):
+            engine.record({f"tag{i % 20}"}, now=0)
+        self.assertTrue(all(score >= 5 for _, score in engine.top(20, now=0)))
+
+    def test_snapshot_restore(self):
+        user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        with self.captureOnCommitCallbacks(execute=True):
+            Tweet.objects.create(user=user, title="test", content="#django")
+        trending.snapshot()
+        self.assertEqual(TrendingSnapshot.objects.count(), 1)
+
+        trending.reset_engine()
+        self.assertEqual([tag for tag, _ in trending.top_hashtags()], ["django"])
+
+    def test_rolled_back_tweet_not_recorded(self):
+        user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Tweet.objects.create(user=user, title="test", content="#rollback")
+                transaction.set_rollback(True)
+            Tweet.objects.create(user=user, title="test", content="#django")
+        self.assertEqual([tag for tag, _ in trending.top_hashtags()], ["django"])
+
+    def test_incremental_top_matches_full_score(self):
+        engine = trending.TrendingEngine(bucket_seconds=60, decay=0.5, top_size=5, capacity=40)
+        for i in range(300):
+            engine.record({f"tag{i % 7 * i % 30}"}, now=i)
+        top = engine.top(5, now=300)
+        scores = [(tag, engine._score(tag, 300)) for tag in engine.scores]
+        expected = sorted(scores, key=lambda item: (-item[1], item[0]))
+        self.assertEqual(top, expected[:5])
+
+    def test_capacity_after_merge_and_load(self):
+        merged = trending.TrendingEngine(bucket_seconds=60, capacity=4)
+        counts = {(merged._bucket_start(time.time()), f"tag{i}"): i + 1 for i in range(10)}
+        merged.add_counts(counts)
+        self.assertEqual(sorted(merged.scores), ["tag8", "tag9"])
+
+        shared = trending.TrendingEngine(bucket_seconds=60)
+        shared.add_counts(counts)
+        loaded = trending.TrendingEngine(bucket_seconds=60, capacity=4)
+        loaded.load(shared.dump())
+        self.assertEqual(sorted(loaded.scores), ["tag8", "tag9"])
+
+        worker1 = trending.create_engine(track_pending=True)
+        worker2 = trending.create_engine(track_pending=True)
+        worker1.record({"one"})
+        worker2.record({"two"})
+        worker2.record({"two"})
+        trending.snapshot(worker1)
+        trending.snapshot(worker2)
+        self.assertEqual([tag for tag, _ in worker2.top()], ["two", "one"])
+
+        trending.snapshot(worker1)
+        self.assertEqual([tag for tag, _ in worker1.top()], ["two", "one"])
+        # 共有済みの分は二重に足さない
+        self.assertEqual(dict(worker1.top())["one"], 1)
+
+
 # class TestLikeView(TestCase):
 #     def test_success_post(self):
 
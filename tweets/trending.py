@@ -0,0 +1,380 @@
+import heapq
+import re
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+HASHTAG_RE = re.compile(r"#(\w+)")
+
+
+def extract_hashtags(*texts):
+    tags = set()
+    for text in texts:
+        tags.update(tag.lower() for tag in HASHTAG_RE.findall(text or ""))
+    return tags
+
+
+class ExactCounter:
+    """バケット内のハッシュタグを正確に数えるカウンター"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    @classmethod
+    def key(cls, tag):
+        return tag
+
+    def add(self, key, count=1):
+        self.counts[key] += count
+
+    def estimate(self, key):
+        return self.counts[key]
+
+    def dump(self):
+        return {"type": "exact", "counts": dict(self.counts)}
+
+    @classmethod
+    def load(cls, state):
+        counter = cls()
+        counter.counts.update(state["counts"])
+        return counter
+
+
+class CountMinSketch:
+    """width * depth の固定メモリで頻度を近似するカウンター(過大評価のみ起こる)"""
+
+    def __init__(self, width=1024, depth=4):
+        if not 1 <= depth <= 16:
+            raise ValueError("depth は 1 以上 16 以下にしてください。")
+        self.width = width
+        self.depth = depth
+        self.tables = [array("q", bytes(8 * width)) for _ in range(depth)]
+
+    @classmethod
+    def key(cls, tag, width=1024, depth=4):
+        """各行のセルの位置。同じ設定のスケッチなら共通なので、呼び出し側で使い回せる"""
+        digest = blake2b(tag.encode(), digest_size=4 * depth).digest()
+        return tuple(int.from_bytes(digest[i * 4 : i * 4 + 4], "little") % width for i in range(depth))
+
+    def add(self, key, count=1):
+        for table, index in zip(self.tables, key):
+            table[index] += count
+
+    def estimate(self, key):
+        return min(table[index] for table, index in zip(self.tables, key))
+
+    def dump(self):
+        # ほとんどのセルは 0 なので、0 以外のセルだけを保存する
+        cells = [
+            [row, col, value] for row, table in enumerate(self.tables) for col, value in enumerate(table) if value
+        ]
+        return {"type": "sketch", "width": self.width, "depth": self.depth, "cells": cells}
+
+    @classmethod
+    def load(cls, state):
+        sketch = cls(width=state["width"], depth=state["depth"])
+        for row, col, value in state["cells"]:
+            sketch.tables[row][col] = value
+        return sketch
+
+
+COUNTER_TYPES = {"exact": ExactCounter, "sketch": CountMinSketch}
+
+
+class TrendingEngine:
+    """
+    時間バケットごとのカウンターを bucket_seconds 単位で回し、直近 window_buckets 個の
+    バケットだけを集計する。古いバケットほど decay 倍ずつ重みを下げる。
+
+    候補タグ (最大 capacity 件) のスコアは record() のたびにそのタグの分だけ更新し、
+    上位 top_size 件を別に持っておく。全候補のスコアを計算し直すのはバケットが切り替わったときだけ。
+    track_pending を有効にすると、snapshot() でまだ共有していない記録を pending に貯める。
+    """
+
+    def __init__(
+        self,
+        bucket_seconds=300,
+        window_buckets=12,
+        decay=1.0,
+        counter="sketch",
+        capacity=1000,
+        top_size=50,
+        track_pending=False,
+        **options,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.decay = decay
+        self.counter = counter
+        self.capacity = capacity
+        self.top_size = top_size
+        self.options = options
+        self.buckets = deque()
+        # 候補タグ -> _scored_at のバケットを基準にしたスコア
+        self.scores = {}
+        self.pending = Counter() if track_pending else None
+        self._scored_at = None
+        self._keys = {}
+        self._top = {}
+        self._top_min = None
+        self._lock = threading.Lock()
+
+    def _new_counter(self):
+        return COUNTER_TYPES[self.counter](**self.options)
+
+    def _key(self, tag):
+        key = self._keys.get(tag)
+        if key is None:
+            key = self._keys[tag] = COUNTER_TYPES[self.counter].key(tag, **self.options)
+        return key
+
+    def _bucket_start(self, now):
+        return int(now // self.bucket_seconds) * self.bucket_seconds
+
+    def _expire(self, now):
+        oldest = self._bucket_start(now) - (self.window_buckets - 1) * self.bucket_seconds
+        while self.buckets and self.buckets[0][0] < oldest:
+            self.buckets.popleft()
+
+    def _score(self, tag, now):
+        key = self._key(tag)
+        current = self._bucket_start(now)
+        score = 0.0
+        for start, counter in self.buckets:
+            age = (current - start) // self.bucket_seconds
+            score += counter.estimate(key) * self.decay**age
+        return score
+
+    def _advance(self, now):
+        """バケットが切り替わっていたら、古いバケットを捨てて全候補のスコアを計算し直す"""
+        current = self._bucket_start(now)
+        if self._scored_at == current:
+            return
+        self._expire(now)
+        self._scored_at = current
+        self._set_scores({tag: score for tag in self.scores if (score := self._score(tag, now)) > 0})
+
+    def _set_scores(self, scores):
+        self.scores = scores
+        self._keys = {tag: key for tag, key in self._keys.items() if tag in scores}
+        self._top = dict(heapq.nlargest(self.top_size, scores.items(), key=lambda item: item[1]))
+        self._top_min = None
+
+    def _update_top(self, tag, score):
+        if tag in self._top:
+            self._top[tag] = score
+            if self._top_min is not None and self._top_min[1] == tag:
+                self._top_min = None
+            return
+        if len(self._top) < self.top_size:
+            self._top[tag] = score
+            self._top_min = None
+            return
+        if self._top_min is None:
+            self._top_min = min((score, tag) for tag, score in self._top.items())
+        if score > self._top_min[0]:
+            del self._top[self._top_min[1]]
+            self._top[tag] = score
+            self._top_min = None
+
+    def record(self, tags, now=None):
+        if not tags:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            start = self._bucket_start(now)
+            if not self.buckets or self.buckets[-1][0] < start:
+                self.buckets.append((start, self._new_counter()))
+            # 時刻が戻った場合も最新のバケットに数える
+            start, counter = self.buckets[-1]
+            for tag in tags:
+                counter.add(self._key(tag))
+                score = self.scores.get(tag)
+                # 最新のバケットの重みは 1 なので、既存の候補は 1 足すだけでよい
+                score = self._score(tag, now) if score is None else score + 1
+                self.scores[tag] = score
+                self._update_top(tag, score)
+                if self.pending is not None:
+                    self.pending[start, tag] += 1
+            self._trim(now)
+
+    def _trim(self, now=None):
+        """候補が capacity を超えていたら、スコア上位の半分だけ残す"""
+        if len(self.scores) <= self.capacity:
+            return
+        if self._scored_at is None:
+            # add_counts() や load() の後はスコアが未計算なので、先に計算し直す
+            self._advance(time.time() if now is None else now)
+        kept = heapq.nlargest(self.capacity // 2, self.scores.items(), key=lambda item: item[1])
+        self._set_scores(dict(kept))
+
+    def top(self, k=10, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            ranking = self._top.items() if k <= self.top_size else self.scores.items()
+            return sorted(ranking, key=lambda item: (-item[1], item[0]))[:k]
+
+    def expire(self, now=None):
+        with self._lock:
+            self._advance(time.time() if now is None else now)
+
+    def add_counts(self, counts):
+        """
+        {(バケットの開始時刻, タグ): 件数} を足し込む。スコアは次に参照したときに計算し直す。
+        候補が capacity を超えた場合だけ、その場で計算し直して record() と同じように減らす
+        """
+        with self._lock:
+            self._add_counts(counts)
+
+    def _add_counts(self, counts):
+        buckets = dict(self.buckets)
+        for (start, tag), count in counts.items():
+            if start not in buckets:
+                buckets[start] = self._new_counter()
+            buckets[start].add(self._key(tag), count)
+            self.scores.setdefault(tag, 0)
+        self.buckets = deque(sorted(buckets.items()))
+        self._scored_at = None
+        self._trim()
+
+    def take_pending(self):
+        with self._lock:
+            pending, self.pending = self.pending, Counter()
+            return pending
+
+    def return_pending(self, pending):
+        """共有に失敗した pending を戻し、次の snapshot() で共有し直す"""
+        with self._lock:
+            self.pending.update(pending)
+
+    def dump(self):
+        with self._lock:
+            return {
+                "buckets": [[start, counter.dump()] for start, counter in self.buckets],
+                "candidates": sorted(self.scores),
+            }
+
+    def load(self, state):
+        with self._lock:
+            self._load(state)
+
+    def replace(self, state):
+        """共有の状態に置き換えたうえで、まだ共有していない pending の分を足し直す"""
+        with self._lock:
+            self._load(state)
+            if self.pending:
+                self._add_counts(self.pending)
+
+    def _load(self, state):
+        self.buckets = deque(
+            (start, COUNTER_TYPES[counter["type"]].load(counter)) for start, counter in state.get("buckets", [])
+        )
+        self._set_scores(dict.fromkeys(state.get("candidates", []), 0))
+        self._scored_at = None
+        self._trim()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_last_snapshot = 0.0
+
+
+def create_engine(**options):
+    return TrendingEngine(
+        bucket_seconds=settings.TRENDING_BUCKET_SECONDS,
+        window_buckets=settings.TRENDING_WINDOW_BUCKETS,
+        decay=settings.TRENDING_DECAY,
+        counter=settings.TRENDING_COUNTER,
+        **options,
+    )
+
+
+def get_engine():
+    global _engine, _last_snapshot
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(track_pending=True)
+                restore(engine)
+                _last_snapshot = time.time()
+                _engine = engine
+    return _engine
+
+
+def reset_engine():
+    global _engine, _last_snapshot
+    _engine = None
+    _last_snapshot = 0.0
+
+
+def restore(engine):
+    from .models import TrendingSnapshot
+
+    try:
+        # snapshot() は常に pk=1 の 1 行を上書きするので、主キーで引く
+        snapshot = TrendingSnapshot.objects.filter(pk=1).first()
+    except DatabaseError:
+        # マイグレーション前などでテーブルが無い場合は空の状態から始める
+        return
+    if snapshot is not None:
+        engine.load(snapshot.payload)
+
+
+def snapshot(engine=None):
+    """
+    このプロセスで数えた分 (pending) を DB の共有スナップショットに足し込み、合算した状態を読み直す。
+    gunicorn の各ワーカーがこれを TRENDING_SNAPSHOT_INTERVAL ごとに行うので、他のワーカーの分も反映される。
+    """
+    from .models import TrendingSnapshot
+
+    global _last_snapshot
+    engine = engine or get_engine()
+    pending = engine.take_pending()
+    try:
+        with transaction.atomic():
+            row, _ = TrendingSnapshot.objects.select_for_update().get_or_create(pk=1)
+            shared = create_engine()
+            shared.load(row.payload)
+            shared.add_counts(pending)
+            shared.expire()
+            row.payload = shared.dump()
+            row.save(update_fields=["payload", "updated_at"])
+    except DatabaseError:
+        # 他のワーカーとの競合などで失敗したら、次の間隔でもう一度共有する
+        engine.return_pending(pending)
+        return
+    finally:
+        _last_snapshot = time.time()
+    engine.replace(row.payload)
+
+
+def flush():
+    """ワーカーの終了時に、まだ共有していない記録をスナップショットに書き出す。集計を使っていなければ何もしない"""
+    if _engine is not None and _engine.pending:
+        snapshot(_engine)
+
+
+def maybe_snapshot(engine):
+    if time.time() - _last_snapshot >= settings.TRENDING_SNAPSHOT_INTERVAL:
+        snapshot(engine)
+
+
+def record_tweets(tweets, now=None):
+    engine = get_engine()
+    for tweet in tweets:
+        engine.record(extract_hashtags(tweet.title, tweet.content), now=now)
+    maybe_snapshot(engine)
+
+
+def top_hashtags(k=10):
+    # 読むだけのワーカーにも他のワーカーの分が届くよう、ここでも定期的に共有する
+    engine = get_engine()
+    maybe_snapshot(engine)
+    return engine.top(k)
@@ -1,20 +1,34 @@
+import json
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.urls import reverse_lazy
-from django.views.generic import CreateView, DeleteView, DetailView, ListView
+from django.views.generic import CreateView, DeleteView, DetailView, ListView, View
 
-from .models import Tweet
+from .forms import TweetForm
+from .models import ArchivedTweet, Tweet
+from .signals import tweets_bulk_created
 
 
 class HomeView(LoginRequiredMixin, ListView):
     template_name = "tweets/home.html"
     model = Tweet
     context_object_name = "tweets"
-    queryset = model.objects.select_related("user")
+    queryset = model.objects.rows()
+
+    def get_context_data(self, **kwargs):
+        # トレンドの集計はホーム画面でしか使わないので、ワーカーの起動時には読み込まない
+        from . import trending
+
+        context = super().get_context_data(**kwargs)
+        context["trending"] = trending.top_hashtags(10)
+        return context
 
 
 class TweetCreateView(LoginRequiredMixin, CreateView):
     template_name = "tweets/create.html"
-    fields = ["title", "content"]
+    form_class = TweetForm
     model = Tweet
     success_url = reverse_lazy("tweets:home")
 
@@ -23,15 +37,95 @@ class TweetCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+class TweetBatchCreateView(LoginRequiredMixin, View):
+    """
+    {"tweets": [{"title": ..., "content": ...}, ...]} を受け取り、TweetForm で 1 件ずつ検証してから
+    正しいものだけを bulk_create でまとめて保存する。結果は件ごとに JSON で返す。
+    ログインしたセッションの Cookie と、X-CSRFToken ヘッダーに CSRF トークン (csrftoken Cookie の値) が必要。
+    """
+
+    def handle_no_permission(self):
+        # API なのでログインページへリダイレクトせず、JSON で 403 を返す
+        return JsonResponse({"error": "ログインしてください。"}, status=403)
+
+    def post(self, request, *args, **kwargs):
+        try:
+            items = json.loads(request.body)["tweets"]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({"error": "リクエストの形式が正しくありません。"}, status=400)
+        if not isinstance(items, list) or not items:
+            return JsonResponse({"error": "tweets には 1 件以上のツイートを指定してください。"}, status=400)
+        if len(items) > settings.TWEET_BATCH_MAX_SIZE:
+            return JsonResponse(
+                {"error": f"一度に投稿できるツイートは {settings.TWEET_BATCH_MAX_SIZE} 件までです。"}, status=400
+            )
+
+        results = []
+        tweets = []
+        for index, item in enumerate(items):
+            form = TweetForm(data=item if isinstance(item, dict) else {})
+            if form.is_valid():
+                form.instance.user = request.user
+                tweets.append(form.instance)
+                results.append({"index": index, "ok": True})
+            else:
+                results.append({"index": index, "ok": False, "errors": form.errors.get_json_data()})
+
+        if tweets:
+            Tweet.objects.bulk_create(tweets)
+            tweets_bulk_created.send(sender=Tweet, tweets=tweets)
+            created = iter(tweets)
+            for result in results:
+                if result["ok"]:
+                    result["id"] = next(created).pk
+        return JsonResponse({"created": len(tweets), "results": results}, status=201 if tweets else 400)
+
+
 class TweetDetailView(LoginRequiredMixin, DetailView):
     model = Tweet
     template_name = "tweets/detail.html"
+    context_object_name = "tweet"
+    queryset = model.objects.select_related("user")
+
+    def get_object(self, queryset=None):
+        # 見つからなければアーカイブ済みのツイートを探す
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            return super().get_object(ArchivedTweet.objects.select_related("user"))
 
 
 class TweetDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     template_name = "tweets/delete.html"
     model = Tweet
+    context_object_name = "tweet"
+    queryset = model.objects.select_related("user")
     success_url = reverse_lazy("tweets:home")
 
+    def get_object(self, queryset=None):
+        # test_func と get() で同じツイートを 2 回読み込まないようにする
+        if not hasattr(self, "object"):
+            try:
+                self.object = super().get_object(queryset)
+            except Http404:
+                # 見つからなければアーカイブ済みのツイートを探す
+                self.object = super().get_object(ArchivedTweet.objects.select_related("user"))
+        return self.object
+
     def test_func(self):
-        return self.get_object().user == self.request.user
+        # POST の権限チェックは post() の条件付き DELETE で行う
+        if self.request.method == "POST":
+            return True
+        return self.get_object().user_id == self.request.user.pk
+
+    def post(self, request, *args, **kwargs):
+        pk = self.kwargs["pk"]
+        # どちらも投稿者のページキャッシュはコミット後に無効化される
+        if not Tweet.objects.delete_owned(pk, request.user):
+            # アーカイブ済みのツイートも投稿者なら削除できる
+            deleted = ArchivedTweet.objects.filter(pk=pk, user=request.user).delete_rows(user_ids=[request.user.pk])
+            if not deleted:
+                if Tweet.objects.filter(pk=pk).exists() or ArchivedTweet.objects.filter(pk=pk).exists():
+                    return self.handle_no_permission()
+                raise Http404
+        return HttpResponseRedirect(self.success_url)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from mysite import benchmarks
+from mysite.pagecache import invalidate_tags, user_tag
+from mysite.testing import isolated_cache
+
+
+class Command(BaseCommand):
+    help = "未ログインユーザー向けページキャッシュのヒット時とミス時のレイテンシを計測します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tweets", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        # 共有の default キャッシュは消さず、空の使い捨てキャッシュで計測する
+        with benchmarks.rollback(), isolated_cache():
+            user = benchmarks.seed(users=1, tweets=options["tweets"])[0]
+            client = benchmarks.client()
+            pages = [
+                ("welcome", "/", "welcome"),
+                ("user_profile", reverse("accounts:user_profile", args=[user.username]), user_tag(user.pk)),
+            ]
+
+            self.stdout.write(f"{'page':<16}{'case':<10}{'queries':>10}{'latency(ms)':>14}")
+            for name, url, tag in pages:
+
+                def miss():
+                    invalidate_tags(tag)
+                    client.get(url)
+
+                # キャッシュするのはミドルウェアを通る前のレスポンスなので、ヒットしても HTML の圧縮 (minify) と
+                # brotli / gzip の圧縮は毎回やり直す。hit (br) はその分を含めたブラウザからのヒット時のコスト
+                cases = [
+                    ("miss", miss),
+                    ("hit", lambda: client.get(url)),
+                    ("hit (br)", lambda: client.get(url, HTTP_ACCEPT_ENCODING="br, gzip")),
+                ]
+                for case, func in cases:
+                    seconds, queries = benchmarks.measure(func, repeat=options["repeat"])
+                    self.stdout.write(f"{name:<16}{case:<10}{queries:>10.1f}{seconds * 1000:>14.3f}")
@@ -0,0 +1,63 @@
+import time
+
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.static import StaticFileIndex, StaticFilesMiddleware
+
+
+class Command(BaseCommand):
+    help = "静的ファイル配信のスループットを、Django の serve ビューと mysite.static で比較します。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="admin/css/base.css")
+        parser.add_argument("--requests", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        index = StaticFileIndex()
+        if not index.files:
+            raise CommandError("STATIC_ROOT が空です。先に collectstatic を実行してください。")
+
+        name = options["path"]
+        hashed_url = staticfiles_storage.url(name)
+        plain_url = staticfiles_storage.base_url + name
+        django_handler = StaticFilesHandler(WSGIHandler())
+        middleware = StaticFilesMiddleware(WSGIHandler(), index)
+        cases = [
+            ("django serve", django_handler, plain_url, ""),
+            ("django serve + gzip accept", django_handler, plain_url, "gzip"),
+            ("mysite.static", middleware, hashed_url, ""),
+            ("mysite.static gzip", middleware, hashed_url, "gzip"),
+            ("mysite.static br", middleware, hashed_url, "br, gzip"),
+        ]
+        self.stdout.write(f"{'case':<28}{'req/s':>10}{'bytes':>10}")
+        for label, application, url, accept_encoding in cases:
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": url,
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "HTTP_HOST": "localhost",
+                "HTTP_ACCEPT_ENCODING": accept_encoding,
+                "wsgi.url_scheme": "http",
+                "wsgi.input": None,
+            }
+            started = time.perf_counter()
+            for _ in range(options["requests"]):
+                size = self.request(application, environ)
+            seconds = time.perf_counter() - started
+            self.stdout.write(f"{label:<28}{options['requests'] / seconds:>10.0f}{size:>10}")
+
+    def request(self, application, environ):
+        statuses = []
+        body = application(dict(environ), lambda status, headers: statuses.append(status))
+        try:
+            size = sum(len(chunk) for chunk in body)
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        if not statuses[0].startswith("200"):
+            raise CommandError(f"{environ['PATH_INFO']}: {statuses[0]}")
+        return size
@@ -1,3 +1,45 @@
-# from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
 
-# Create your tests here.
+from mysite.pagecache import invalidate_tags
+from mysite.testing import run_in_another_process
+
+User = get_user_model()
+
+
+class TestWelcomeView(TestCase):
+    def setUp(self):
+        self.url = "/"
+        cache.clear()
+
+    def test_success_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "welcome/welcome.html")
+
+    def test_success_get_from_cache(self):
+        self.client.get(self.url)
+        with self.assertTemplateNotUsed("welcome/welcome.html"):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Cookie", response["Vary"])
+
+        invalidate_tags("welcome")
+        with self.assertTemplateUsed("welcome/welcome.html"):
+            self.client.get(self.url)
+
+    def test_invalidate_from_another_process(self):
+        self.client.get(self.url)
+        # 別のワーカーでの無効化を、別プロセスのキャッシュクライアントで再現する
+        run_in_another_process("from mysite import pagecache; pagecache.invalidate_tags('welcome')")
+        with self.assertTemplateUsed("welcome/welcome.html"):
+            self.client.get(self.url)
+
+    def test_success_get_with_login_user(self):
+        self.client.get(self.url)
+        User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, "welcome/welcome.html")
+        self.assertContains(response, "Logout")
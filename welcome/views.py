@@ -1,5 +1,8 @@
 from django.views.generic import TemplateView
 
+from mysite.pagecache import CachedPageMixin
 
-class WelcomeView(TemplateView):
+
+class WelcomeView(CachedPageMixin, TemplateView):
     template_name = "welcome/welcome.html"
+    cache_tags = ("welcome",)